@@ -1,14 +1,18 @@
 import os
-import re
-import base64
-from io import StringIO
+import time
 from datetime import datetime, timedelta
 
-import pandas as pd
-import requests
 import streamlit as st
 import streamlit.components.v1 as components
 
+from drawers import drawers_changed, drawers_in_room, load_drawers, rooms, DRAWER_SHEET_DTYPES
+from assets import asset_url, asset_file, THUMB_SIZE, DISPLAY_SIZE, SEARCH_THUMB_SIZE
+from exports import FORMATS, CHUNK_ROWS, deferred_downloads_supported, export_file, frame_chunks
+from metrics import metrics, start_metrics_server
+from sheets import endpoint_health_rows, set_sheet_schema, set_sheet_label, sheet_cache
+from sync import (is_sync_leader, load_snapshot, read_meta, read_sheet, read_sheets, read_summary, set_snapshot_summary,
+                  snapshot_result, snapshot_version, start_background_sync, sync_status, SYNC_INTERVAL)
+
 st.set_page_config(page_title="TRACKER", layout="wide")
 
 TITLE = "TRACKER : Automated tool inventory management online inventory management portal"
@@ -16,7 +20,11 @@ TITLE = "TRACKER : Automated tool inventory management online inventory manageme
 # -------------------------
 # Demo data initializer
 # -------------------------
+DEMO_USERS = ["alice", "bob", "charlie", "admin"]
+
 def init_data():
+    import pandas as pd
+
     inventory = pd.DataFrame([
         {"id": 1, "name": "Cordless Drill", "category": "Power Tools", "quantity": 5, "location": "Shelf A1", "status": "available", "last_updated": datetime.now().isoformat()},
         {"id": 2, "name": "Hammer", "category": "Hand Tools", "quantity": 10, "location": "Shelf B3", "status": "available", "last_updated": (datetime.now()-timedelta(days=1)).isoformat()},
@@ -30,130 +38,206 @@ def init_data():
         {"event_id": 103, "item_id": 1, "item_name": "Cordless Drill", "user": "bob", "action": "returned", "timestamp": (datetime.now()-timedelta(hours=2)).isoformat()},
         {"event_id": 104, "item_id": 4, "item_name": "Safety Glasses", "user": "charlie", "action": "reported_missing", "timestamp": (datetime.now()-timedelta(days=5)).isoformat()},
     ])
-    users = ["alice", "bob", "charlie", "admin"]
-    return inventory, usage, users
+    return inventory, usage, list(DEMO_USERS)
 
 # -------------------------
 # Configs: sheet URLs & images
 # -------------------------
-DRAWER_URLS = {
-    1: "https://docs.google.com/spreadsheets/d/1tbGORyBH36yx2R_iR1IYcHu4MwbSKrfE/edit?usp=drive_link&ouid=115545081311750015459&rtpof=true&sd=true",
-    2: "https://docs.google.com/spreadsheets/d/1JOYSm855CuvnA6d-QXZC82Vpe0BrlrWi/edit?usp=sharing&ouid=115545081311750015459&rtpof=true&sd=true",
-    3: "https://docs.google.com/spreadsheets/d/10Y_HRew2IdvVlXMe8Kf5RFJGAieZtllC/edit?usp=drive_link&ouid=115545081311750015459&rtpof=true&sd=true",
-    4: "https://docs.google.com/spreadsheets/d/1Zsv2g7p_kb_Vmt2R5iD5G9GBbhmwLZSF/edit?usp=drive_link&ouid=115545081311750015459&rtpof=true&sd=true",
-    5: "https://docs.google.com/spreadsheets/d/1m06qyNzwYF_0fZnFpZA0QSpiumqdsHtr/edit?usp=drive_link&ouid=115545081311750015459&rtpof=true&sd=true",
-    6: "https://docs.google.com/spreadsheets/d/1wJU5SC9VL5yeewjZivBRbyO3LtiXrVA9/edit?usp=sharing&ouid=115545081311750015459&rtpof=true&sd=true",
-    7: "https://docs.google.com/spreadsheets/d/1Dc0myxSLB_dTSR-eFE4BZ8ZjqnSpDBkA/edit?usp=sharing&ouid=115545081311750015459&rtpof=true&sd=true",
-}
-
-DRAWER_IMAGES = {i: f"tools-drawer{i}.jpg" for i in range(1, 8)}
+# Drawers, their rooms, sheets and photos come from drawers.json (see drawers.py).
+# Prefix a sheet URL with "service_account:" to read a private sheet through the
+# Sheets API (set GOOGLE_SERVICE_ACCOUNT_FILE); tabs of one spreadsheet are batched.
+DRAWERS = load_drawers()
+DRAWER_URLS = {i: d["url"] for i, d in DRAWERS.items() if d["url"]}
+DRAWER_IMAGES = {i: d["image"] for i, d in DRAWERS.items() if d["image"]}
+ROOMS = rooms(DRAWERS)
+
+# Drawer lists are paged so a page costs what it shows, not the number of drawers.
+DRAWER_BUTTONS_PER_PAGE = 21
+DRAWER_BUTTONS_PER_ROW = 7
+MISSING_ITEMS_PER_PAGE = 10
+
+def drawer_summary(df):
+    """Kept in the snapshot summary, so Missing Items can skip drawers with nothing removed."""
+    from history import currently_removed_items
+
+    return {"removed": len(currently_removed_items(df)) if df.shape[1] >= 2 else 0}
 
 CUSTOMER_SHEET_URL = "https://docs.google.com/spreadsheets/d/1zpeOkT6cBPOMlVWeqHG9YLpEaT8YTIse/edit?usp=sharing&ouid=115545081311750015459&rtpof=true&sd=true"
 
+def register_drawer_sheets(urls: dict):
+    """Schema, metrics label and summary per drawer sheet, and the set of sheets the background sync polls."""
+    for i, url in urls.items():
+        set_sheet_schema(url, dtypes=DRAWER_SHEET_DTYPES)
+        set_sheet_label(url, f"drawer_{i}")
+        set_snapshot_summary(url, drawer_summary)
+    set_sheet_label(CUSTOMER_SHEET_URL, "customers")
+    start_background_sync(list(urls.values()) + [CUSTOMER_SHEET_URL])
+
+# Once per drawers.json version rather than on every rerun.
+if drawers_changed(DRAWERS):
+    register_drawer_sheets(DRAWER_URLS)
+
 # External custom tool-cutout URL (per your request)
 CUSTOM_TOOL_CUTOUT_URL = "https://trackertoolcutter.streamlit.app/"
 
+# Status fields and Missing Items rows re-render themselves this often (0 disables).
+LIVE_REFRESH_SECONDS = float(os.environ.get("LIVE_REFRESH_SECONDS", "10"))
+
+# Tool search box in the nav bar: results shown per query.
+SEARCH_RESULTS = 20
+
 # -------------------------
 # Helpers
 # -------------------------
-def extract_doc_id(sheet_url: str) -> str:
-    m = re.search(r"/d/([a-zA-Z0-9-_]+)", sheet_url)
-    return m.group(1) if m else ""
-
-def extract_gid(sheet_url: str) -> str:
-    m = re.search(r"[#&]gid=([0-9]+)", sheet_url)
-    if m:
-        return m.group(1)
-    m = re.search(r"[?&]gid=([0-9]+)", sheet_url)
-    if m:
-        return m.group(1)
-    return "0"
-
-def build_export_urls(doc_id: str, gid: str):
-    urls = []
-    urls.append(f"https://docs.google.com/spreadsheets/d/{doc_id}/export?format=csv&gid={gid}")
-    urls.append(f"https://docs.google.com/spreadsheets/d/{doc_id}/gviz/tq?tqx=out:csv&gid={gid}")
-    return urls
-
-def embed_local_image_html(path: str, width: int = 400, height: int = 306):
-    if not os.path.exists(path):
-        return None
+def static_serving_enabled() -> bool:
     try:
-        with open(path, "rb") as f:
-            data = f.read()
-        b64 = base64.b64encode(data).decode("utf-8")
-        ext = os.path.splitext(path)[1].lower().lstrip(".")
-        mime = f"image/{'jpeg' if ext in ['jpg','jpeg'] else ext}"
-        html = f"""
-        <div style="text-align:left;">
-          <img src="data:{mime};base64,{b64}" width="{width}" height="{height}" style="object-fit:cover; border-radius:6px; display:block;" />
-        </div>
-        """
-        return html
+        return bool(st.get_option("server.enableStaticServing"))
     except Exception:
+        return False
+
+def embed_local_image_html(path: str, width: int = 400, height: int = 306, box_height: int = None):
+    """
+    <img> markup for a local image, referenced by URL as a pre-resized static asset
+    (see assets.py) so the browser can cache it. Returns None when the asset can't be
+    served that way; callers then fall back to st.image.
+    If box_height is provided, the image sits in a block of that height (row alignment).
+    """
+    if not static_serving_enabled():
         return None
+    url = asset_url(path, (width, height))
+    if not url:
+        return None
+    box_style = f" height:{box_height}px;" if box_height else ""
+    return f"""
+        <div style="text-align:left;{box_style}">
+          <img src="{url}" width="{width}" height="{height}" style="object-fit:cover; border-radius:6px; display:block;" />
+        </div>
+        """
 
 def embed_local_image_responsive_html(path: str, max_width_px: int = 900, display_height_px: int = None):
     """
     Render a local file as a responsive image: width constrained by container,
-    preserving aspect ratio. If display_height_px provided, set component height (for Streamlit).
+    preserving aspect ratio. If display_height_px provided, reserve that much height.
+    Served as a static asset like embed_local_image_html.
     """
-    if not os.path.exists(path):
+    if not static_serving_enabled():
         return None
-    try:
-        with open(path, "rb") as f:
-            data = f.read()
-        b64 = base64.b64encode(data).decode("utf-8")
-        ext = os.path.splitext(path)[1].lower().lstrip(".")
-        mime = f"image/{'jpeg' if ext in ['jpg','jpeg'] else ext}"
-        # Use max-width to make image responsive and avoid clipping; height:auto preserves aspect ratio.
-        html = f"""
-        <div style="display:flex; justify-content:flex-start; align-items:center;">
-          <img src="data:{mime};base64,{b64}" style="max-width:{max_width_px}px; width:100%; height:auto; border-radius:6px; display:block;" />
+    url = asset_url(path)
+    if not url:
+        return None
+    box_style = f" min-height:{display_height_px}px;" if display_height_px else ""
+    # Use max-width to make image responsive and avoid clipping; height:auto preserves aspect ratio.
+    return f"""
+        <div style="display:flex; justify-content:flex-start; align-items:center;{box_style}">
+          <img src="{url}" style="max-width:{max_width_px}px; width:100%; height:auto; border-radius:6px; display:block;" />
         </div>
         """
-        return html
-    except Exception:
+
+def live_fragment(run_every):
+    """
+    Decorator that re-runs just the decorated block every run_every seconds
+    (st.fragment, or st.experimental_fragment on Streamlit 1.33-1.36), so live
+    panes update without a full script rerun. On older Streamlit, or with
+    LIVE_REFRESH_SECONDS=0, it is a no-op and panes update on the next rerun.
+    """
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    if fragment is None or not run_every:
+        return lambda fn: fn
+    return fragment(run_every=run_every)
+
+def refresh_control(key: str) -> bool:
+    """
+    "Refresh now" button for panes that show Google Sheets data. Sheets are otherwise
+    read from the local snapshots kept by the background sync; returns True when the
+    user asked for a refresh.
+    """
+    c1, c2 = st.columns([1, 5])
+    with c1:
+        clicked = st.button("Refresh now", key=key)
+    with c2:
+        live = f" Shown data updates live every {int(LIVE_REFRESH_SECONDS)} s." if LIVE_REFRESH_SECONDS else ""
+        st.caption(f"Sheets are synced in the background about every {int(SYNC_INTERVAL)} s.{live}")
+    return clicked
+
+def paginate(total: int, page_size: int, key: str, unit: str = "rows") -> int:
+    """Page picker for server-side paging; returns the offset of the first row to show."""
+    pages = max(1, -(-total // page_size))
+    # The page lives only in session_state (no value=), so it can be clamped when the total shrinks.
+    st.session_state[key] = min(st.session_state.get(key, 1), pages)
+    c1, c2 = st.columns([1, 4])
+    with c1:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=key)
+    with c2:
+        st.caption(f"{total:,} {unit}, {page_size} per page")
+    return (int(page) - 1) * page_size
+
+def room_filter(key: str):
+    """Room picker shown when drawers span several rooms; returns the room, or None for all."""
+    if len(ROOMS) < 2:
         return None
+    room = st.selectbox("Room", ["All rooms"] + ROOMS, key=key)
+    return None if room == "All rooms" else room
+
+def drawer_name(i) -> str:
+    drawer = DRAWERS.get(i)
+    return drawer["name"] if drawer else f"Drawer {i}"
 
-def fetch_sheet_csv(sheet_url: str):
-    doc_id = extract_doc_id(sheet_url)
-    if not doc_id:
-        return None, None, None, "Could not extract document id from URL."
-
-    gid = extract_gid(sheet_url)
-    candidate_urls = build_export_urls(doc_id, gid)
-
-    last_status = None
-    last_snippet = ""
-    for url in candidate_urls:
-        try:
-            resp = requests.get(url, timeout=20)
-        except Exception as e:
-            last_status = None
-            last_snippet = str(e)
-            continue
-
-        last_status = resp.status_code
-        if resp.status_code == 200:
-            try:
-                df = pd.read_csv(StringIO(resp.text))
-                return df, url, resp.status_code, resp.text[:800]
-            except Exception as e:
-                return None, url, resp.status_code, f"Fetched content but failed to parse CSV: {e}\nSnippet: {resp.text[:800]}"
+def export_download(label: str, source: str, version, chunks_fn, base_name: str, key: str):
+    """
+    Download control that serializes the data only when clicked, in the chosen format.
+    The export is cached on disk per data version, so re-downloading unchanged data is free.
+    chunks_fn returns an iterable of DataFrames.
+    """
+    c1, c2 = st.columns([1, 3])
+    with c1:
+        fmt = st.selectbox("Format", list(FORMATS), key=f"{key}_format", label_visibility="collapsed")
+    ext, mime = FORMATS[fmt]
+    file_name = f"{base_name}.{ext}"
+
+    def build():
+        with open(export_file(source, version, fmt, chunks_fn), "rb") as f:
+            return f.read()
+
+    with c2:
+        if deferred_downloads_supported():
+            st.download_button(label, data=build, file_name=file_name, mime=mime, key=key)
         else:
-            last_snippet = resp.text[:800]
+            # Older Streamlit: generate on an explicit click, then offer the file.
+            ready_key = f"{key}_ready"
+            if st.button(f"Prepare: {label}", key=f"{key}_prepare"):
+                st.session_state[ready_key] = (version, fmt)
+            if st.session_state.get(ready_key) == (version, fmt):
+                st.download_button(label, data=build(), file_name=file_name, mime=mime, key=key)
+
+def get_seeded_store():
+    """The shared inventory store, seeded with the demo data if it is empty."""
+    from storage import get_store
+
+    store = get_store()
+    if store.is_empty():
+        inv, usage, _ = init_data()
+        store.import_frames(inv, usage)
+    return store
+
+def show_snapshot_freshness(meta: dict):
+    """Timestamp of the snapshot being shown, plus a warning if the latest sync failed."""
+    fetched_at = meta.get("fetched_at")
+    if not fetched_at:
+        return
+    when = datetime.fromtimestamp(fetched_at).strftime("%Y-%m-%d %H:%M:%S")
+    st.caption(f"Data as of {when} ({int(time.time() - fetched_at)} s ago)")
+    if meta.get("last_error"):
+        st.warning(f"Latest sync failed, showing the last good copy from {when}. Error: {meta['last_error'][:200]}")
 
-    return None, candidate_urls[-1] if candidate_urls else None, last_status, last_snippet
+start_metrics_server()
 
 # -------------------------
 # Initialize session state
 # -------------------------
-if "inventory_df" not in st.session_state:
-    inv, usage, users = init_data()
-    st.session_state.inventory_df = inv
-    st.session_state.usage_df = usage
-    st.session_state.users = users
+# Kept cheap: no pandas, database or network here, so the first paint (Status)
+# doesn't wait on them. Panes import what they need when first shown.
+if "selected" not in st.session_state:
+    st.session_state.users = list(DEMO_USERS)
     st.session_state.selected = "Status"
     st.session_state.master_control = True
     st.session_state.selected_drawer = None
@@ -167,6 +251,8 @@ st.markdown(
     <style>
     .tab-button { padding:6px 8px; border-radius:6px; }
     .status-pill { display:inline-block; padding:6px 12px; border-radius:14px; color:#ffffff; font-weight:700; background:#16a34a; }
+    .status-pill.degraded { background:#d97706; }
+    .status-pill.syncing { background:#6b7280; }
     .passcode-box {
       display:block;
       width:100%;
@@ -202,7 +288,7 @@ banner_path = "topbanner.png"
 if os.path.exists(banner_path):
     banner_html = embed_local_image_responsive_html(banner_path, max_width_px=900)
     if banner_html:
-        components.html(banner_html, height=160)
+        st.markdown(banner_html, unsafe_allow_html=True)
     else:
         st.image(banner_path, use_column_width=True)
 else:
@@ -214,7 +300,7 @@ else:
 st.markdown(f"<h1 style='margin:12px 0 12px 0; text-align:left;'>{TITLE}</h1>", unsafe_allow_html=True)
 
 # Top nav bar: include "Create Custom Tool-Cutout" as a regular Streamlit button so styling matches exactly.
-options = ["Status", "Usage History", "Inventory Data", "Missing Items", "Admin Panel", "Create Custom Tool-Cutout"]
+options = ["Status", "Usage History", "Inventory Data", "Missing Items", "Fleet Overview", "Admin Panel", "Create Custom Tool-Cutout"]
 cols = st.columns([1] * len(options), gap="small")
 for i, opt in enumerate(options):
     with cols[i]:
@@ -227,6 +313,11 @@ for i, opt in enumerate(options):
             else:
                 st.session_state.selected = opt
 
+# Tool search across every drawer and the inventory (answered from a local index, see search.py).
+tool_query = st.text_input("Find a tool", key="tool_search", label_visibility="collapsed",
+                           placeholder="Find a tool by ID or name in any drawer or the inventory")
+search_results = st.container()
+
 # Auto-lock admin when navigating away from Admin Panel
 if st.session_state.get("selected") != "Admin Panel" and st.session_state.get("admin_unlocked", False):
     st.session_state.admin_unlocked = False
@@ -236,14 +327,30 @@ pane = st.container()
 # -------------------------
 # Page panes (unchanged)
 # -------------------------
-def show_status():
-    st.subheader("Status Panel")
+@live_fragment(LIVE_REFRESH_SECONDS)
+def live_status_fields():
+    """Status row derived from the sheet sync state; re-rendered on its own timer."""
+    status = sync_status(list(DRAWER_URLS.values()) + [CUSTOMER_SHEET_URL])
+    if not status["synced"]:
+        label, css = "SYNCING", "syncing"
+    elif status["failing"]:
+        label, css = "DEGRADED", "degraded"
+    else:
+        label, css = "ONLINE", ""
 
     c1, c2 = st.columns([2, 4])
     with c1:
         st.write("1. Current Status")
     with c2:
-        st.markdown('<span class="status-pill">ONLINE</span>', unsafe_allow_html=True)
+        st.markdown(f'<span class="status-pill {css}">{label}</span>', unsafe_allow_html=True)
+        if status["synced"]:
+            st.caption(f"{status['synced']}/{status['sheets']} sheets synced, {status['failing']} failing; "
+                       f"newest data {int(time.time() - status['newest'])} s old")
+
+def show_status():
+    st.subheader("Status Panel")
+
+    live_status_fields()
 
     c1, c2 = st.columns([2, 4])
     with c1:
@@ -285,17 +392,24 @@ def show_status():
     with c1:
         st.write("5. Current Room")
     with c2:
-        st.write("LB 172 - Robotics Research Lab")
+        st.write(", ".join(ROOMS) if len(ROOMS) <= 3 else f"{len(ROOMS)} rooms, {len(DRAWERS)} drawers")
 
 def show_usage_history():
     st.subheader("Usage History")
     st.write("Select a drawer to view its image and sheet:")
 
-    btn_cols = st.columns(7, gap="small")
-    for i in range(1, 8):
-        with btn_cols[i-1]:
-            if st.button(f"Drawer {i}", key=f"drawer_btn_{i}"):
-                st.session_state.selected_drawer = i
+    # Only one page of drawer buttons is built per run.
+    ids = drawers_in_room(DRAWERS, room_filter("usage_room"))
+    offset = 0
+    if len(ids) > DRAWER_BUTTONS_PER_PAGE:
+        offset = paginate(len(ids), DRAWER_BUTTONS_PER_PAGE, key="usage_drawer_page", unit="drawers")
+    page_ids = ids[offset:offset + DRAWER_BUTTONS_PER_PAGE]
+    for row in range(0, len(page_ids), DRAWER_BUTTONS_PER_ROW):
+        btn_cols = st.columns(DRAWER_BUTTONS_PER_ROW, gap="small")
+        for col, i in zip(btn_cols, page_ids[row:row + DRAWER_BUTTONS_PER_ROW]):
+            with col:
+                if st.button(drawer_name(i), key=f"drawer_btn_{i}"):
+                    st.session_state.selected_drawer = i
 
     st.markdown("---")
     selected = st.session_state.selected_drawer
@@ -303,15 +417,15 @@ def show_usage_history():
         st.info("No drawer selected. Click a Drawer button above.")
         return
 
-    st.write(f"Displaying: Drawer {selected}")
+    st.write(f"Displaying: {drawer_name(selected)}")
 
     local_img = DRAWER_IMAGES.get(selected)
     if local_img and os.path.exists(local_img):
-        img_html = embed_local_image_html(local_img, width=400, height=306)
+        img_html = embed_local_image_html(local_img, width=DISPLAY_SIZE[0], height=DISPLAY_SIZE[1])
         if img_html:
-            components.html(img_html, height=330)
+            st.markdown(img_html, unsafe_allow_html=True)
         else:
-            st.image(local_img, width=400)
+            st.image(asset_file(local_img, DISPLAY_SIZE) or local_img, width=DISPLAY_SIZE[0])
     else:
         placeholder = f"https://via.placeholder.com/400x306.png?text=Drawer+{selected}+Image+not+found"
         components.html(f'<div style="text-align:center;"><img src="{placeholder}" width="400" height="306" style="object-fit:cover; border-radius:6px;" /></div>', height=330)
@@ -321,9 +435,14 @@ def show_usage_history():
         st.error("No sheet URL configured for this drawer.")
         return
 
-    st.write("Loading sheet as CSV... (attempting multiple export endpoints)")
-    df, used_url, status, snippet = fetch_sheet_csv(sheet_url)
+    from history import get_view
+
+    refresh = refresh_control("refresh_usage_history")
+    (df, used_url, status, snippet), meta = read_sheet(sheet_url, refresh=refresh)
 
+    if df is None and meta.get("pending"):
+        st.info(snippet)
+        return
     if df is None:
         st.error("Failed to load CSV.")
         if status:
@@ -336,23 +455,28 @@ def show_usage_history():
         st.info("Common fixes: set the sheet's Share → 'Anyone with the link' → Viewer, or Publish → 'Publish to web' for that sheet/tab. If sheets are private, use a service account (gspread).")
         return
 
-    first_col = df.columns[0]
-    df[first_col] = pd.to_numeric(df[first_col], errors='coerce')
-    df_sorted = df.sort_values(by=first_col, ascending=True, na_position='last').reset_index(drop=True)
+    view = get_view(df)
 
-    if df_sorted.shape[1] > 6:
-        df_display = df_sorted.iloc[:, :6].copy()
-    else:
-        df_display = df_sorted.copy()
-
-    st.success(f"Loaded sheet from: {used_url}  (rows: {len(df_sorted)}, cols: {len(df_sorted.columns)})")
-    st.dataframe(df_display)
-    st.download_button("Download sheet CSV", data=df_sorted.to_csv(index=False).encode("utf-8"), file_name=f"drawer_{selected}.csv", mime="text/csv")
+    st.success(f"Loaded sheet from: {used_url}  (rows: {len(df)}, cols: {len(df.columns)})")
+    show_snapshot_freshness(meta)
+    query = st.text_input("Filter rows (matches any of the shown columns)", key=f"usage_filter_{selected}")
+    page_size = 100
+    offset = paginate(view.count(query), page_size, key=f"usage_page_{selected}")
+    df_display, _ = view.page(offset, page_size, query=query)
+    if df_display.shape[1] > 6:
+        df_display = df_display.iloc[:, :6]
+    with metrics.timer("render_stage_seconds", pane="usage_history", stage="dataframe"):
+        st.dataframe(df_display)
+    export_download("Download sheet", f"drawer_{selected}", snapshot_version(sheet_url) or id(df),
+                    lambda: frame_chunks(view.sorted_frame()), f"drawer_{selected}", key="download_drawer")
 
 def show_inventory_data():
+    from storage import INVENTORY_ORDERS
+    from usage_log import ACTIONS as USAGE_ACTIONS, get_usage_log
+
     st.subheader("Inventory Data")
-    inv = st.session_state.inventory_df.copy()
-    st.write("You can add new items using the form below. Use the table to review current inventory. (This demo stores data in memory for this session.)")
+    store = get_seeded_store()
+    st.write("You can add new items using the form below. Use the table to review current inventory. (Items are kept in the shared inventory database.)")
 
     with st.expander("Add new inventory item"):
         with st.form("add_item_form", clear_on_submit=True):
@@ -362,94 +486,236 @@ def show_inventory_data():
             location = st.text_input("Location")
             submitted = st.form_submit_button("Add item")
             if submitted:
-                new_id = int(inv["id"].max() + 1) if not inv.empty else 1
-                new_item = {"id": new_id, "name": name, "category": category or "Uncategorized",
-                            "quantity": int(quantity), "location": location or "Unspecified",
-                            "status": "available" if quantity > 0 else "missing",
-                            "last_updated": datetime.now().isoformat()}
-                st.session_state.inventory_df = pd.concat([st.session_state.inventory_df, pd.DataFrame([new_item])], ignore_index=True)
+                new_id = store.add_item(name=name, category=category or "Uncategorized",
+                                        quantity=int(quantity), location=location or "Unspecified",
+                                        status="available" if quantity > 0 else "missing")
                 st.success(f"Added item '{name}' (id: {new_id})")
 
-    st.download_button("Download inventory CSV", data=st.session_state.inventory_df.to_csv(index=False).encode("utf-8"), file_name="inventory_export.csv", mime="text/csv")
+    with st.expander("Check out / return an item"):
+        with st.form("usage_event_form", clear_on_submit=True):
+            item_id = st.number_input("Item id", min_value=1, step=1)
+            user = st.selectbox("User", st.session_state.users)
+            action = st.radio("Action", USAGE_ACTIONS, horizontal=True)
+            if st.form_submit_button("Record"):
+                item = store.get_item(item_id)
+                if item is None:
+                    st.error(f"No item with id {int(item_id)}")
+                else:
+                    event_id = get_usage_log().append(item_id, user, action, item_name=item["name"])
+                    st.success(f"Recorded {action} of '{item['name']}' by {user} (event {event_id})")
+
+    held = get_usage_log().current_state()
+    st.write(f"Checked out or reported missing right now: {len(held)}")
+    if len(held):
+        st.dataframe(held, hide_index=True)
+
+    export_download("Download inventory", "inventory", store.data_version(),
+                    lambda: store.iter_items(chunksize=CHUNK_ROWS), "inventory_export", key="download_inventory")
     st.subheader("Inventory Table")
-    st.dataframe(st.session_state.inventory_df.sort_values(["category", "name"]).reset_index(drop=True))
 
-def show_missing_items():
+    c1, c2 = st.columns([3, 1])
+    with c1:
+        query = st.text_input("Search name or location", key="inventory_search")
+    with c2:
+        order = st.selectbox("Sort by", list(INVENTORY_ORDERS), key="inventory_order")
+    page_size = 100
+    total = store.count_items(query)
+    offset = paginate(total, page_size, key="inventory_page")
+    with metrics.timer("render_stage_seconds", pane="inventory_data", stage="query"):
+        page_df = store.page_items(offset=offset, limit=page_size, order=order, query=query)
+    with metrics.timer("render_stage_seconds", pane="inventory_data", stage="dataframe"):
+        st.dataframe(page_df, hide_index=True)
+
+def render_removed_items(i, df, used_url, status, snippet, row_table_height):
+    """Left-hand side of a Missing Items row: currently removed items for drawer i."""
+    from history import get_tracker
+
+    if df is None:
+        st.warning(f"{drawer_name(i)}: failed to load sheet. Last status: {status}")
+        if used_url:
+            st.write(f"Last tried URL: {used_url}")
+        if snippet:
+            st.code(snippet)
+        components.html(f'<div style="height:{row_table_height}px;"></div>', height=8)
+        return
+
+    if df.shape[1] < 2:
+        st.info(f"{drawer_name(i)}: sheet has fewer than 2 columns; cannot determine last action.")
+        components.html(f'<div style="height:{row_table_height}px;"></div>', height=8)
+        return
+
+    with metrics.timer("missing_items_compute_seconds", drawer=i):
+        currently_removed = get_tracker(i).update(df)
+
+    if currently_removed.empty:
+        st.write("No currently removed items found in this drawer (based on the last history entry).")
+        components.html(f'<div style="height:{row_table_height}px;"></div>', height=8)
+    else:
+        if currently_removed.shape[1] > 6:
+            display_df = currently_removed.iloc[:, :6].copy()
+        else:
+            display_df = currently_removed.copy()
+        with metrics.timer("render_stage_seconds", pane="missing_items", stage="dataframe"):
+            st.dataframe(display_df, height=row_table_height)
+
+def removed_items_row(i, result, meta, row_table_height):
+    """Left-hand side of a Missing Items row from its snapshot read (see sync.read_sheets)."""
+    df, used_url, status, snippet = result
+    if df is None and (meta.get("pending") or not meta.get("last_attempt")):
+        st.info(f"{drawer_name(i)}: still fetching the sheet in the background.")
+        components.html(f'<div style="height:{row_table_height}px;"></div>', height=8)
+        return
+    if df is None:
+        status = status or meta.get("status")
+    else:
+        show_snapshot_freshness(meta)
+    render_removed_items(i, df, used_url, status, snippet, row_table_height)
+
+@live_fragment(LIVE_REFRESH_SECONDS)
+def missing_items_rows(room, only_removed):
     """
-    For each drawer (1..7) render one row: left=currently removed items (by grouping on col1 and
-    taking group's last entry and checking col2 for 'removed'), right=image (250x191).
-    Each row has a fixed height so image and table align.
+    The Missing Items list below the filters, re-rendered on its own timer without
+    a full script rerun. Each tick re-applies the removed-items filter (the summary
+    is one stat unless it changed, so a drawer that gains removed items shows up)
+    and rebuilds only this page's rows from the memoized snapshots and trackers;
+    nothing is fetched unless a drawer on the page has no snapshot yet.
     """
-    st.subheader("Missing Items — Currently Removed (based on last history entry)")
+    # A "Refresh now" click reruns the script once; the fragment's own ticks must not repeat it.
+    refresh = st.session_state.pop("missing_items_refresh", False)
+    ids = drawers_in_room(DRAWERS, room)
+    if only_removed:
+        summary = read_summary()
+        ids = [i for i in ids if i in DRAWER_URLS and summary.get(DRAWER_URLS[i], {}).get("removed", 1) > 0]
+        if not ids:
+            st.success("No drawer has removed items right now.")
+            return
+    offset = paginate(len(ids), MISSING_ITEMS_PER_PAGE, key="missing_items_page", unit="drawers")
 
     row_table_height = 200
+    slots = {}
 
-    for i in range(1, 8):
-        st.markdown(f"### Drawer {i}")
+    for i in ids[offset:offset + MISSING_ITEMS_PER_PAGE]:
+        st.markdown(f"### {drawer_name(i)}")
         left_col, right_col = st.columns([3, 1])
 
-        # LEFT: compute currently removed items
+        # LEFT: placeholder, filled in once the drawer's sheet has been read
         with left_col:
             sheet_url = DRAWER_URLS.get(i)
             if not sheet_url:
-                st.info(f"Drawer {i}: no sheet URL configured.")
+                st.info(f"{drawer_name(i)}: no sheet URL configured.")
                 components.html(f'<div style="height:{row_table_height}px;"></div>', height=8)
             else:
-                df, used_url, status, snippet = fetch_sheet_csv(sheet_url)
-                if df is None:
-                    st.warning(f"Drawer {i}: failed to load sheet. Last status: {status}")
-                    if used_url:
-                        st.write(f"Last tried URL: {used_url}")
-                    if snippet:
-                        st.code(snippet)
-                    components.html(f'<div style="height:{row_table_height}px;"></div>', height=8)
-                else:
-                    if df.shape[1] < 2:
-                        st.info(f"Drawer {i}: sheet has fewer than 2 columns; cannot determine last action.")
-                        components.html(f'<div style="height:{row_table_height}px;"></div>', height=8)
-                    else:
-                        first_col = df.columns[0]
-                        second_col = df.columns[1]
-                        # group and get last row per key (preserve file order)
-                        try:
-                            last_indices = df.groupby(df[first_col], sort=False).apply(lambda g: g.index[-1])
-                            last_idx_list = list(last_indices.values)
-                            last_rows = df.loc[last_idx_list].reset_index(drop=True)
-                        except Exception:
-                            grouped = {}
-                            for idx, row in df.iterrows():
-                                key = row[first_col]
-                                grouped[key] = idx
-                            last_idx_list = list(grouped.values())
-                            last_rows = df.loc[last_idx_list].reset_index(drop=True)
-
-                        mask = last_rows[second_col].astype(str).str.lower().str.contains("removed", na=False)
-                        currently_removed = last_rows[mask].reset_index(drop=True)
-
-                        if currently_removed.empty:
-                            st.write("No currently removed items found in this drawer (based on the last history entry).")
-                            components.html(f'<div style="height:{row_table_height}px;"></div>', height=8)
-                        else:
-                            if currently_removed.shape[1] > 6:
-                                display_df = currently_removed.iloc[:, :6].copy()
-                            else:
-                                display_df = currently_removed.copy()
-                            st.dataframe(display_df, height=row_table_height)
+                slots[i] = st.empty()
+                slots[i].write(f"Loading drawer {i} sheet...")
 
         # RIGHT: image
         with right_col:
             img_path = DRAWER_IMAGES.get(i)
             if img_path and os.path.exists(img_path):
-                img_html = embed_local_image_html(img_path, width=250, height=191)
+                img_html = embed_local_image_html(img_path, width=THUMB_SIZE[0], height=THUMB_SIZE[1], box_height=row_table_height)
                 if img_html:
-                    components.html(img_html, height=row_table_height)
+                    st.markdown(img_html, unsafe_allow_html=True)
                 else:
-                    st.image(img_path, width=250, caption=f"Drawer {i}")
+                    st.image(asset_file(img_path, THUMB_SIZE) or img_path, width=THUMB_SIZE[0], caption=drawer_name(i))
                     components.html(f'<div style="height:{row_table_height - 24}px;"></div>', height=8)
             else:
                 placeholder = f"https://via.placeholder.com/250x191.png?text=Drawer+{i}"
                 components.html(f'<div style="text-align:center;"><img src="{placeholder}" width="250" height="191" style="object-fit:cover; border-radius:6px;" /></div>', height=row_table_height)
 
+    # Snapshots first, then any drawer without one fetched in parallel, rendered in completion order.
+    for i, result, meta in read_sheets({i: DRAWER_URLS[i] for i in slots}, refresh=refresh):
+        with slots[i].container():
+            removed_items_row(i, result, meta, row_table_height)
+
+def show_missing_items():
+    """
+    For each drawer on the current page render one row: left=currently removed items (last
+    entry per col1 key whose col2 contains 'removed', tracked incrementally per drawer),
+    right=image (250x191). Each row has a fixed height so image and table align.
+    By default only drawers whose snapshot summary counts removed items are listed (plus
+    drawers not summarized yet), so neither snapshots nor images of the other drawers are
+    touched. Rows are filled from the local sheet snapshots; drawers on the page without
+    one yet are fetched in parallel and each row's table fills in as its sheet arrives.
+    The list then refreshes itself every LIVE_REFRESH_SECONDS (see missing_items_rows).
+    """
+    st.subheader("Missing Items — Currently Removed (based on last history entry)")
+
+    if refresh_control("refresh_missing_items"):
+        st.session_state.missing_items_refresh = True
+
+    c1, c2 = st.columns([2, 3])
+    with c1:
+        room = room_filter("missing_room")
+    with c2:
+        only_removed = st.checkbox("Only drawers with removed items", value=True, key="missing_only_removed")
+    missing_items_rows(room, only_removed)
+
+def show_fleet_overview():
+    """
+    One dashboard across all drawers, built from a combined event table
+    (see fleet.py). The aggregations are recomputed only when a drawer's data changes.
+    """
+    import altair as alt
+    from fleet import fleet_summary
+
+    st.subheader("Fleet Overview — all drawers")
+    refresh = refresh_control("refresh_fleet")
+    room = room_filter("fleet_room")
+
+    frames = {}
+    failed = []
+    urls = {i: DRAWER_URLS[i] for i in drawers_in_room(DRAWERS, room) if i in DRAWER_URLS}
+    for i, (df, used_url, status, snippet), meta in read_sheets(urls, refresh=refresh):
+        if df is None:
+            failed.append(i)
+        else:
+            frames[i] = df
+    if failed:
+        st.warning(f"No data for drawer(s) {', '.join(str(i) for i in sorted(failed))}; they are left out of the summary.")
+    if not frames:
+        st.info("No drawer data available yet.")
+        return
+
+    with metrics.timer("render_stage_seconds", pane="fleet_overview", stage="aggregate"):
+        summary = fleet_summary(frames)
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Drawers", summary["drawers"])
+    c2.metric("Events", f"{summary['events']:,}")
+    c3.metric("Currently removed", int(summary["removed_now"]["currently_removed"].sum()))
+    mean_hours = summary["mean_checkout_hours"]
+    c4.metric("Mean checkout", f"{mean_hours:.1f} h" if mean_hours is not None else "n/a")
+
+    left, right = st.columns(2)
+    with left:
+        st.markdown("#### Currently removed per drawer")
+        st.altair_chart(alt.Chart(summary["removed_now"]).mark_bar().encode(
+            x=alt.X("drawer:O", title="Drawer"), y=alt.Y("currently_removed:Q", title="Items out"),
+            tooltip=["drawer", "currently_removed"]), use_container_width=True)
+    with right:
+        st.markdown("#### Most frequently removed tools")
+        st.altair_chart(alt.Chart(summary["top_tools"]).mark_bar().encode(
+            y=alt.Y("tool:N", sort="-x", title="Tool (drawer #key)"), x=alt.X("removals:Q", title="Removals"),
+            tooltip=["drawer", "key", "removals"]), use_container_width=True)
+
+    left, right = st.columns(2)
+    with left:
+        st.markdown("#### Removals per user per day")
+        if summary["per_user_day"].empty:
+            st.write("No timestamp column found in the drawer sheets.")
+        else:
+            st.altair_chart(alt.Chart(summary["per_user_day"]).mark_line(point=True).encode(
+                x=alt.X("day:T", title="Day"), y=alt.Y("removals:Q", title="Removals"), color="user:N",
+                tooltip=["user", "day", "removals"]), use_container_width=True)
+    with right:
+        st.markdown("#### Mean checkout duration per drawer")
+        if summary["checkout"].empty:
+            st.write("No completed checkouts (removal followed by a return) with timestamps yet.")
+        else:
+            st.altair_chart(alt.Chart(summary["checkout"]).mark_bar().encode(
+                x=alt.X("drawer:O", title="Drawer"), y=alt.Y("mean_hours:Q", title="Hours"),
+                tooltip=["drawer", "mean_hours", "checkouts"]), use_container_width=True)
+
 def show_admin_panel():
     """
     Admin panel locked behind passcode "3721".
@@ -479,9 +745,13 @@ def show_admin_panel():
     st.markdown("---")
     st.markdown("### current customers with access")
 
-    st.write("Loading customers sheet... (attempting multiple export endpoints)")
-    df, used_url, status, snippet = fetch_sheet_csv(CUSTOMER_SHEET_URL)
+    refresh = refresh_control("refresh_customers")
+    (df, used_url, status, snippet), meta = read_sheet(CUSTOMER_SHEET_URL, refresh=refresh)
 
+    if df is None and meta.get("pending"):
+        st.info(snippet)
+        show_diagnostics()
+        return
     if df is None:
         st.error("Failed to load customers sheet.")
         if status:
@@ -492,6 +762,7 @@ def show_admin_panel():
             st.write("Response / error snippet (truncated):")
             st.code(snippet)
         st.info("Common fixes: set the sheet's Share → 'Anyone with the link' → Viewer, or Publish → 'Publish to web' for that sheet/tab.")
+        show_diagnostics()
         return
 
     if df.shape[1] > 6:
@@ -500,8 +771,11 @@ def show_admin_panel():
         df_display = df.copy()
 
     st.success(f"Loaded sheet from: {used_url}  (rows: {len(df)}, cols: {len(df.columns)})")
-    st.dataframe(df_display)
-    st.download_button("Download customers CSV", data=df.to_csv(index=False).encode("utf-8"), file_name="current_customers.csv", mime="text/csv")
+    show_snapshot_freshness(meta)
+    with metrics.timer("render_stage_seconds", pane="admin_panel", stage="dataframe"):
+        st.dataframe(df_display)
+    export_download("Download customers", "customers", snapshot_version(CUSTOMER_SHEET_URL) or id(df),
+                    lambda: frame_chunks(df), "current_customers", key="download_customers")
 
     edit_button_html = f'''
       <div style="margin-top:12px;">
@@ -510,10 +784,93 @@ def show_admin_panel():
     '''
     st.markdown(edit_button_html, unsafe_allow_html=True)
 
+    show_diagnostics()
+
+def show_diagnostics():
+    """Collapsed section at the bottom of the unlocked Admin Panel: render/fetch timings."""
+    import pandas as pd
+
+    with st.expander("Diagnostics", expanded=False):
+        stats = sheet_cache.stats
+        lookups = stats["hits"] + stats["stale"] + stats["misses"]
+        hit_rate = f"{(stats['hits'] + stats['stale']) / lookups:.0%}" if lookups else "n/a"
+        uptime = int(time.time() - metrics.started_at)
+        st.write(f"Sheet cache: hit rate {hit_rate} ({stats['stale']} served stale while revalidating), "
+                 f"{stats['revalidated']} revalidated (304), "
+                 f"{stats['evictions']} evictions, {sheet_cache.total_bytes / 1e6:.1f} MB cached. Collecting for {uptime} s.")
+        st.write(f"Worker process {os.getpid()}: " + ("runs the background sheet sync." if is_sync_leader()
+                                                      else "reads snapshots synced by another worker."))
+        health = endpoint_health_rows()
+        if health:
+            st.write("Sheet endpoints (a tripped breaker skips the endpoint until its cooldown ends):")
+            st.dataframe(pd.DataFrame(health), hide_index=True)
+        rows = metrics.rows()
+        if rows:
+            st.dataframe(pd.DataFrame(rows), hide_index=True)
+        else:
+            st.write("No measurements yet.")
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            st.download_button("Export Prometheus text", data=metrics.to_prometheus(), file_name="tracker_metrics.prom", mime="text/plain")
+        with c2:
+            st.download_button("Export JSON lines", data=metrics.to_json_lines(), file_name="tracker_metrics.jsonl", mime="application/x-ndjson")
+        with c3:
+            if st.button("Reset counters", key="reset_metrics"):
+                metrics.reset()
+
+def open_drawer(drawer_id):
+    st.session_state.selected = "Usage History"
+    st.session_state.selected_drawer = drawer_id
+    st.session_state.tool_search = ""
+
+def show_tool_search(query: str):
+    """
+    Results for the nav-bar search box: where each matching tool is and whether it
+    is in right now. Answered from the process-wide index, which only re-reads
+    drawer snapshots that changed, so no sheet is fetched.
+    """
+    from search import get_index
+    from usage_log import get_usage_log
+
+    index = get_index()
+    with metrics.timer("render_stage_seconds", pane="tool_search", stage="refresh"):
+        index.refresh(DRAWER_URLS, store=get_seeded_store(), usage=get_usage_log())
+    results = index.search(query, limit=SEARCH_RESULTS)
+    if not results:
+        st.info(f"No tool matching \"{query}\" in any drawer snapshot or the inventory.")
+        return
+    st.caption(f"Top {len(results)} matches for \"{query}\"")
+    for n, r in enumerate(results):
+        c1, c2, c3 = st.columns([1, 5, 1])
+        state = "out" if r["out"] else "in"
+        if r["source"] == "drawer":
+            with c1:
+                img_path = DRAWER_IMAGES.get(r["drawer"])
+                if img_path and os.path.exists(img_path):
+                    st.image(asset_file(img_path, SEARCH_THUMB_SIZE) or img_path, width=SEARCH_THUMB_SIZE[0])
+            with c2:
+                name = f" {r['name']}" if r["name"] else ""
+                who = f" by {r['user']}" if r["user"] else ""
+                when = f" at {r['when']}" if r["when"] is not None else ""
+                st.markdown(f"**{drawer_name(r['drawer'])}** · tool #{r['key']}{name} · **{state}**  \n"
+                            f"Last action: {r['action']}{who}{when}")
+            with c3:
+                st.button("Open", key=f"search_open_{n}", on_click=open_drawer, args=(r["drawer"],))
+        else:
+            with c2:
+                who = f" ({r['action'].replace('_', ' ')} by {r['user']})" if r["user"] else ""
+                st.markdown(f"**Inventory** · #{r['key']} {r['name']} · **{state}**{who}  \n"
+                            f"{r['location']} · status {r['status']}")
+    st.markdown("---")
+
 # -------------------------
 # Render selected pane
 # -------------------------
-with pane:
+if tool_query.strip():
+    with search_results:
+        show_tool_search(tool_query)
+
+with pane, metrics.timer("pane_render_seconds", pane=st.session_state.selected):
     selected = st.session_state.selected
     if selected == "Status":
         show_status()
@@ -523,10 +880,12 @@ with pane:
         show_inventory_data()
     elif selected == "Missing Items":
         show_missing_items()
+    elif selected == "Fleet Overview":
+        show_fleet_overview()
     elif selected == "Admin Panel":
         show_admin_panel()
     else:
         st.write("Select a section from the bar above.")
 
 st.markdown("----")
-st.caption("This is a demo Streamlit app. Data is stored only for the current session. For production use, connect to a database and add authentication.")
+st.caption("This is a demo Streamlit app. Inventory data is stored in a local SQLite database shared by all sessions. For production use, add authentication.")
@@ -0,0 +1,93 @@
+"""
+Image asset pipeline.
+
+Drawer photos and the banner are resized once to the sizes the panes display
+and written to ./static/thumbs/ under a name that includes the source file's
+mtime. With Streamlit static serving enabled (.streamlit/config.toml) they are
+referenced by URL (app/static/thumbs/...), so the browser can cache them
+instead of receiving base64 copies inside an iframe on every rerun.
+"""
+import os
+import threading
+
+from metrics import metrics
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(APP_DIR, "static")
+THUMB_DIR = os.path.join(STATIC_DIR, "thumbs")
+STATIC_URL_PREFIX = "app/static/thumbs"
+
+# Sizes used by the panes: Missing Items rows, the Usage History drawer view and tool search results.
+THUMB_SIZE = (250, 191)
+DISPLAY_SIZE = (400, 306)
+SEARCH_THUMB_SIZE = (96, 73)
+
+_built = {}
+_lock = threading.Lock()
+
+def asset_name(path: str, size=None, mtime_ns: int = 0) -> str:
+    stem, ext = os.path.splitext(os.path.basename(path))
+    ext = ext.lower()
+    size_tag = f"-{size[0]}x{size[1]}" if size else ""
+    return f"{stem}{size_tag}-{mtime_ns:x}{ext}"
+
+def resize_image(path: str, out_path: str, size) -> bool:
+    """Crop/resize like CSS object-fit:cover; False if Pillow isn't available."""
+    # Imported here: only resized assets need Pillow, and the first paint (banner) doesn't.
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:  # Pillow ships with streamlit, but keep working without it
+        return False
+    with Image.open(path) as im:
+        fmt = im.format
+        thumb = ImageOps.fit(im, size, method=Image.LANCZOS)
+        if fmt == "JPEG":
+            thumb.save(out_path, format="JPEG", quality=85, optimize=True, progressive=True)
+        else:
+            thumb.save(out_path, format=fmt, optimize=True)
+    return True
+
+def build_asset(path: str, size=None):
+    """
+    Write a copy of the image at path to THUMB_DIR, cropped/resized to size
+    (width, height) like CSS object-fit:cover, or unchanged when size is None.
+    Returns the asset file name, or None if the source is missing or can't be read.
+    Results are memoized per (path, size, mtime), so each asset is built once.
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    key = (path, size, mtime_ns)
+    name = _built.get(key)
+    if name is not None:
+        metrics.inc("asset_requests_total", result="hit")
+        return name
+
+    with _lock, metrics.timer("asset_build_seconds"):
+        name = asset_name(path, size, mtime_ns)
+        out_path = os.path.join(THUMB_DIR, name)
+        metrics.inc("asset_requests_total", result="build")
+        if not os.path.exists(out_path):
+            try:
+                os.makedirs(THUMB_DIR, exist_ok=True)
+                tmp_path = f"{out_path}.{os.getpid()}.tmp"
+                if size is None or not resize_image(path, tmp_path, size):
+                    with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+                        dst.write(src.read())
+                os.replace(tmp_path, out_path)
+            except Exception:
+                return None
+        _built[key] = name
+        return name
+
+def asset_url(path: str, size=None):
+    """Browser URL for the (resized) image, or None if it couldn't be built."""
+    name = build_asset(path, size)
+    return f"{STATIC_URL_PREFIX}/{name}" if name else None
+
+def asset_file(path: str, size=None):
+    """Local path of the (resized) image, or None if it couldn't be built."""
+    name = build_asset(path, size)
+    return os.path.join(THUMB_DIR, name) if name else None
@@ -0,0 +1,100 @@
+"""
+Fetch-engine resilience benchmark: hedging, circuit breaker, stale-while-revalidate.
+
+Each scenario runs in a fresh process against the local stand-in
+(bench/fake_sheets.py) with a given fault, once with the mechanism enabled
+and once with it disabled, and reports fetch latency and how many requests
+reached the server:
+
+  stragglers  a small fraction of /export requests take --slow-ms longer;
+              hedging re-sends them to gviz after the export p95
+  outage      every /export request fails with a 503; the breaker skips
+              export after a few failures instead of trying it first each time
+  stale       the cached copy is always stale (TTL 0); stale-while-revalidate
+              returns it at once, the alternative waits for the revalidation
+
+    python -m bench.bench_resilience --iterations 200 --slow-ms 1500
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from bench.bench_sheets import percentile
+
+DOC_ID = "rows-2000"
+SCENARIOS = {
+    # name: (fake server settings, env with the mechanism on, env with it off)
+    "stragglers": ({"export_slow_rate": 0.04}, {}, {"SHEET_HEDGING": "0"}),
+    "outage": ({"export_error_rate": 1.0, "error_status": 503}, {}, {"SHEET_BREAKER_THRESHOLD": "1000000"}),
+    "stale": ({}, {}, {"FORCE": "1"}),
+}
+
+# -------------------------
+# Child: one scenario run
+# -------------------------
+def run_child(iterations: int, force: bool):
+    from metrics import metrics
+    from sheets import fetch_sheet_csv
+    from bench.fake_sheets import sheet_url
+
+    url = sheet_url(DOC_ID)
+    fetch_sheet_csv(url, force=True)  # warm the connection pool and the cache
+    samples, failures = [], 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        df, _, status, _ = fetch_sheet_csv(url, force=force)
+        samples.append(time.perf_counter() - start)
+        failures += df is None
+    hedged = sum(r["count"] for r in metrics.rows() if r["metric"] == "sheet_hedged_requests_total")
+    return {"p50_ms": round(percentile(samples, 0.5) * 1000, 1), "p99_ms": round(percentile(samples, 0.99) * 1000, 1),
+            "failures": failures, "hedged": hedged}
+
+# -------------------------
+# Parent
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Fetch-engine resilience benchmark")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--slow-ms", type=float, default=1500, help="extra latency of a straggling /export request")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.iterations, force=os.environ.get("FORCE", "0") == "1")))
+        return 0
+
+    from bench.fake_sheets import FakeSheets
+
+    header = f"{'scenario':11} {'mechanism':9} {'p50 ms':>8} {'p99 ms':>8} {'failures':>8} {'hedged':>7} {'requests':>9}"
+    print(header)
+    print("-" * len(header))
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+        fault, on_env, off_env = SCENARIOS[name]
+        for mode, extra in (("on", on_env), ("off", off_env)):
+            fake = FakeSheets(latency_ms=args.latency_ms, slow_ms=args.slow_ms, **fault)
+            fake.body(DOC_ID, "0")
+            server, base_url = fake.serve()
+            env = dict(os.environ, SHEETS_BASE_URL=base_url, SHEET_CACHE_TTL="0", **extra)
+            # The fault scenarios fetch with force=True every time; "stale" reads through the cache.
+            if name != "stale":
+                env["FORCE"] = "1"
+            out = subprocess.run([sys.executable, "-m", "bench.bench_resilience", "--child",
+                                  "--iterations", str(args.iterations)],
+                                 env=env, cwd=cwd, capture_output=True, text=True)
+            server.shutdown()
+            if out.returncode != 0:
+                print(f"{name} ({mode}) failed:\n{out.stderr}", file=sys.stderr)
+                continue
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{name:11} {mode:9} {r['p50_ms']:>8} {r['p99_ms']:>8} {r['failures']:>8} {r['hedged']:>7} {fake.requests:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
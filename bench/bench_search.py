@@ -0,0 +1,75 @@
+"""
+Tool search benchmark: index build, refresh and query latency over many drawers.
+
+Writes --drawers synthetic drawer snapshots (with a tool-name column) to a
+scratch SNAPSHOT_DIR, builds the search index from them, then reports the
+cost of a quiet refresh, a refresh after one drawer changed, and p50/p99
+query latency for a few query shapes (ID, name word, name prefixes).
+
+    python -m bench.bench_search --drawers 300 --rows 2000
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+from bench.bench_sheets import percentile
+
+QUERIES = ["42", "drill", "torque 10", "cord dri", "4"]
+TOOL_NAMES = ["Cordless Drill", "Hammer", "Torque Wrench 10mm", "Multimeter", "Hex Key Set"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tool search benchmark")
+    parser.add_argument("--drawers", type=int, default=300)
+    parser.add_argument("--rows", type=int, default=2000, help="history rows per drawer")
+    parser.add_argument("--iterations", type=int, default=200, help="runs per query")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="cloudportal-search-")
+    os.environ["SNAPSHOT_DIR"] = os.path.join(scratch, "snapshots")
+    try:
+        import numpy as np
+        import sync
+        from search import ToolIndex
+        from bench.fake_sheets import sheet_url, synthetic_history
+
+        urls = {}
+        for d in range(1, args.drawers + 1):
+            urls[d] = url = sheet_url(f"drawer-{d}")
+            df = synthetic_history(args.rows, seed=d).astype({"Tool ID": "Int32", "Action": "category", "User": "category"})
+            df["Tool name"] = np.asarray(TOOL_NAMES)[df["Tool ID"].to_numpy() % len(TOOL_NAMES)]
+            sync.write_snapshot(url, df, url, 200)
+
+        index = ToolIndex()
+        t = time.perf_counter()
+        index.refresh(urls, force=True)
+        print(f"{args.drawers} drawers x {args.rows} rows: {len(index.docs):,} tools, {len(index.postings):,} tokens")
+        print(f"{'cold build':24} {(time.perf_counter() - t) * 1000:>9.1f} ms")
+        t = time.perf_counter()
+        index.refresh(urls, force=True)
+        print(f"{'quiet refresh':24} {(time.perf_counter() - t) * 1000:>9.1f} ms")
+        df, _ = sync.load_snapshot(urls[1])
+        time.sleep(0.01)  # a new mtime, so the snapshot version changes
+        sync.write_snapshot(urls[1], df.iloc[:-1], urls[1], 200)
+        t = time.perf_counter()
+        index.refresh(urls, force=True)
+        print(f"{'one drawer changed':24} {(time.perf_counter() - t) * 1000:>9.1f} ms")
+
+        print(f"\n{'query':12} {'p50 ms':>8} {'p99 ms':>8} {'hits':>5}")
+        for query in QUERIES:
+            samples = []
+            for _ in range(args.iterations):
+                t = time.perf_counter()
+                hits = index.search(query)
+                samples.append(time.perf_counter() - t)
+            print(f"{query!r:12} {percentile(samples, 0.5) * 1000:>8.2f} {percentile(samples, 0.99) * 1000:>8.2f} {len(hits):>5}")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
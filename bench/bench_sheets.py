@@ -0,0 +1,211 @@
+"""
+Offline benchmark for the sheet fetch / Missing Items / Usage History hot paths.
+
+Starts the local Google Sheets stand-in (bench/fake_sheets.py) and, for each
+history size, runs the measurements in a fresh subprocess so peak RSS is per
+size. Reports p50/p99 latency, throughput (rows/s) and peak RSS.
+
+    python -m bench.bench_sheets --sizes 100,10000,100000,1000000
+    python -m bench.bench_sheets --save baseline.json
+    python -m bench.bench_sheets --compare baseline.json --latency-ms 30 --error-rate 0.1
+    python -m bench.bench_sheets --backend service_account
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+DEFAULT_SIZES = "100,1000,10000,100000,1000000"
+MULTI_TABS = 8
+MULTI_MAX_ROWS = 100_000
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[idx]
+
+def summarize(name, rows, samples, failures=0):
+    total = sum(samples)
+    return {
+        "scenario": name,
+        "rows": rows,
+        "runs": len(samples),
+        "failures": failures,
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 2) if samples else None,
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 2) if samples else None,
+        "rows_per_s": round(rows * len(samples) / total) if total else None,
+    }
+
+def timed(fn, iterations):
+    samples, failures, result = [], 0, None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception:
+            failures += 1
+            continue
+        samples.append(time.perf_counter() - start)
+    return samples, failures, result
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+# -------------------------
+# Child: measurements for one size
+# -------------------------
+def run_child(rows: int, base_url: str, iterations: int, backend: str = "csv"):
+    os.environ["SHEETS_BASE_URL"] = base_url
+    os.environ["SHEETS_API_BASE_URL"] = base_url
+    import sheets
+    from drawers import DRAWER_SHEET_DTYPES
+    from history import RemovedItemsTracker, currently_removed_items, sort_by_key
+    from bench.fake_sheets import sheet_url
+
+    service_account = backend == "service_account"
+    url = sheet_url(f"rows-{rows}", service_account=service_account)
+    sheets.set_sheet_schema(url, dtypes=DRAWER_SHEET_DTYPES)
+    results = []
+
+    def cold_fetch():
+        sheets.sheet_cache.invalidate()
+        df = sheets.fetch_sheet_csv(url, force=True)[0]
+        if df is None:
+            raise RuntimeError("fetch failed")
+        return df
+
+    samples, failures, df = timed(cold_fetch, iterations)
+    results.append(summarize("fetch_sheet_csv (cold)", rows, samples, failures))
+    if df is None:
+        return {"rows": rows, "results": results, "peak_rss_mb": peak_rss_mb()}
+    frame_mb = round(df.memory_usage(deep=True).sum() / 1e6, 2)
+
+    def revalidate():
+        if sheets.fetch_sheet_csv(url, force=True)[0] is None:
+            raise RuntimeError("fetch failed")
+
+    samples, failures, _ = timed(revalidate, iterations)
+    # The API has no conditional requests: a forced fetch re-reads the values.
+    results.append(summarize("fetch_sheet_csv (forced re-read)" if service_account else "fetch_sheet_csv (304 revalidate)",
+                             rows, samples, failures))
+
+    if rows <= MULTI_MAX_ROWS:
+        # Several tabs of one spreadsheet: one request each, or one batchGet.
+        urls = {gid: sheet_url(f"rows-{rows}", str(gid), service_account) for gid in range(MULTI_TABS)}
+
+        def fetch_tabs():
+            sheets.sheet_cache.invalidate()
+            if any(result[0] is None for _, result in sheets.fetch_many(urls, force=True)):
+                raise RuntimeError("fetch failed")
+
+        samples, failures, _ = timed(fetch_tabs, iterations)
+        results.append(summarize(f"fetch_many ({MULTI_TABS} tabs, cold)", rows * MULTI_TABS, samples, failures))
+
+    samples, failures, _ = timed(lambda: currently_removed_items(df), iterations)
+    results.append(summarize("missing items: last state (full)", rows, samples, failures))
+
+    # Incremental tracker: state covers all but the last 1% of rows, then the append is processed.
+    split = max(1, len(df) - max(1, len(df) // 100))
+    head = df.iloc[:split]
+    inc_samples = []
+    for _ in range(iterations):
+        tracker = RemovedItemsTracker()
+        tracker.update(head)
+        start = time.perf_counter()
+        tracker.update(df)
+        inc_samples.append(time.perf_counter() - start)
+    results.append(summarize("missing items: last state (+1% rows)", len(df) - split, inc_samples))
+
+    def usage_history():
+        df_sorted = sort_by_key(df)
+        return df_sorted.iloc[:, :6] if df_sorted.shape[1] > 6 else df_sorted
+
+    samples, failures, _ = timed(usage_history, iterations)
+    results.append(summarize("usage history: sort + slice", rows, samples, failures))
+
+    return {"rows": rows, "results": results, "peak_rss_mb": peak_rss_mb(), "frame_mb": frame_mb}
+
+# -------------------------
+# Parent: server + report
+# -------------------------
+def print_report(runs, baseline=None):
+    base = {}
+    for run in baseline or []:
+        for r in run["results"]:
+            base[(r["scenario"], run["rows"])] = r
+    header = f"{'scenario':40} {'rows':>9} {'runs':>5} {'fail':>5} {'p50 ms':>10} {'p99 ms':>10} {'rows/s':>12} {'RSS MB':>8} {'frame MB':>9}"
+    if base:
+        header += f" {'p50 vs base':>12}"
+    print(header)
+    print("-" * len(header))
+    for run in runs:
+        for r in run["results"]:
+            line = (f"{r['scenario']:40} {r['rows']:>9} {r['runs']:>5} {r['failures']:>5} "
+                    f"{str(r['p50_ms']):>10} {str(r['p99_ms']):>10} {str(r['rows_per_s']):>12} {run['peak_rss_mb']:>8} {str(run.get('frame_mb')):>9}")
+            b = base.get((r["scenario"], run["rows"]))
+            if b and b.get("p50_ms") and r.get("p50_ms"):
+                line += f" {(r['p50_ms'] / b['p50_ms'] - 1) * 100:>+11.1f}%"
+            print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline sheet benchmark")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated history sizes (rows)")
+    parser.add_argument("--iterations", type=int, default=None, help="runs per scenario (default scales with size)")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--export-error-rate", type=float, default=0)
+    parser.add_argument("--save", help="write results as JSON (e.g. a baseline)")
+    parser.add_argument("--compare", help="baseline JSON to compare p50 against")
+    parser.add_argument("--backend", choices=["csv", "service_account"], default="csv",
+                        help="public CSV export or the service-account Sheets API path")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(run_child(args.child, args.base_url, args.iterations, args.backend)))
+        return
+
+    from bench.fake_sheets import FakeSheets
+    fake = FakeSheets(args.latency_ms, args.jitter_ms, args.error_rate, args.export_error_rate)
+    server, base_url = fake.serve()
+
+    runs = []
+    for rows in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        iterations = args.iterations or (20 if rows <= 10_000 else 10 if rows <= 100_000 else 5)
+        # Generate bodies outside the measured window.
+        for gid in range(MULTI_TABS if rows <= MULTI_MAX_ROWS else 1):
+            fake.body(f"rows-{rows}", str(gid))
+        out = subprocess.run(
+            [sys.executable, "-m", "bench.bench_sheets", "--child", str(rows),
+             "--base-url", base_url, "--iterations", str(iterations), "--backend", args.backend],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        if out.returncode != 0:
+            print(f"rows={rows}: benchmark child failed\n{out.stderr}", file=sys.stderr)
+            continue
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    server.shutdown()
+    print(f"fake server calls: {fake.requests} total, API: {dict(fake.calls)}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["runs"]
+    print_report(runs, baseline)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "argv": sys.argv[1:], "runs": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Startup / first-paint benchmark.
+
+Each repetition starts a fresh Python process (a new replica) that imports
+Streamlit, runs app.py once as a new session (the Status pane, i.e. first
+paint), then opens every other pane once. Reported per step: median wall time
+and which heavy libraries the step had to import. Drawer sheets are served by
+the local stand-in (bench/fake_sheets.py), with an empty snapshot directory
+and database, so pane steps include their cold fetches.
+
+    python -m bench.bench_startup --repeat 5 --budget-ms 1500
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "requests", "altair", "PIL", "sqlite3"]
+PANES = ["Usage History", "Inventory Data", "Missing Items", "Fleet Overview", "Admin Panel"]
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def loaded():
+    return {m for m in HEAVY_MODULES if m in sys.modules}
+
+# -------------------------
+# Child: one cold replica
+# -------------------------
+def run_child():
+    steps = []
+    t = time.perf_counter()
+    import streamlit  # noqa: F401  (the server imports it before running the script)
+    steps.append({"step": "import streamlit", "ms": (time.perf_counter() - t) * 1000, "imports": sorted(loaded())})
+
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(APP_DIR, "app.py"), default_timeout=300)
+
+    def step(name, prepare=None):
+        before = loaded()
+        if prepare:
+            prepare()
+        t = time.perf_counter()
+        at.run()
+        steps.append({"step": name, "ms": (time.perf_counter() - t) * 1000,
+                      "imports": sorted(loaded() - before),
+                      "errors": [str(e.value)[:200] for e in at.exception]})
+
+    step("first paint (Status)")
+    step("rerun (Status)")
+    for pane in PANES:
+        def select(pane=pane):
+            at.session_state["selected"] = pane
+            at.session_state["admin_unlocked"] = pane == "Admin Panel"
+        step(f"open {pane}", select)
+    return steps
+
+# -------------------------
+# Parent
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Startup / first-paint benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh processes to measure")
+    parser.add_argument("--budget-ms", type=float, default=1500,
+                        help="budget for process start + first paint of the Status pane")
+    parser.add_argument("--rows", type=int, default=5000, help="rows per fake drawer sheet")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child()))
+        return
+
+    from bench.fake_sheets import FakeSheets, synthetic_history
+    fake = FakeSheets()
+    sources = ""
+    for name in ("app.py", "drawers.json"):
+        with open(os.path.join(APP_DIR, name), "r", encoding="utf-8") as f:
+            sources += f.read()
+    doc_ids = sorted(set(re.findall(r"/spreadsheets/d/([A-Za-z0-9_-]+)", sources)))
+    for n, doc_id in enumerate(doc_ids):
+        fake.set_sheet(doc_id, "0", synthetic_history(args.rows, seed=n))
+    server, base_url = fake.serve()
+
+    runs, totals = [], []
+    for _ in range(args.repeat):
+        scratch = tempfile.mkdtemp(prefix="cloudportal-startup-")
+        env = dict(os.environ, SHEETS_BASE_URL=base_url,
+                   SNAPSHOT_DIR=os.path.join(scratch, "snapshots"),
+                   INVENTORY_DB_PATH=os.path.join(scratch, "inventory.db"),
+                   EXPORT_DIR=os.path.join(scratch, "exports"))
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-m", "bench.bench_startup", "--child"],
+                             env=env, cwd=APP_DIR, capture_output=True, text=True)
+        shutil.rmtree(scratch, ignore_errors=True)
+        if out.returncode != 0:
+            print(f"child failed:\n{out.stderr}", file=sys.stderr)
+            continue
+        steps = json.loads(out.stdout.strip().splitlines()[-1])
+        runs.append(steps)
+        # Process start (interpreter + imports) is the wall time not spent in later steps.
+        after_paint = sum(s["ms"] for s in steps[2:])
+        totals.append((time.perf_counter() - start) * 1000 - after_paint)
+    server.shutdown()
+    if not runs:
+        return 1
+
+    header = f"{'step':28} {'p50 ms':>9} {'max ms':>9}  new heavy imports"
+    print(header)
+    print("-" * len(header))
+    for n, first in enumerate(runs[0]):
+        samples = [r[n]["ms"] for r in runs]
+        print(f"{first['step']:28} {statistics.median(samples):>9.1f} {max(samples):>9.1f}  "
+              f"{', '.join(first['imports']) or '-'}")
+        for err in first.get("errors", []):
+            print(f"    error: {err}")
+    paint = statistics.median(totals)
+    verdict = "within" if paint <= args.budget_ms else "OVER"
+    print(f"\nprocess start to first paint: p50 {paint:.0f} ms ({verdict} the {args.budget_ms:.0f} ms budget)")
+    return 0 if paint <= args.budget_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
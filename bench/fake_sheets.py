@@ -0,0 +1,235 @@
+"""
+Local stand-in for the Google Sheets CSV export endpoints, for offline benchmarks.
+
+Serves the two URL shapes built by sheets.build_export_urls():
+
+    /spreadsheets/d/<doc_id>/export?format=csv&gid=<gid>
+    /spreadsheets/d/<doc_id>/gviz/tq?tqx=out:csv&gid=<gid>
+
+and the two Sheets API v4 calls used by gsheets_api.py:
+
+    /v4/spreadsheets/<doc_id>                     (tab metadata)
+    /v4/spreadsheets/<doc_id>/values:batchGet?ranges=...
+
+Documents named "rows-<N>" (e.g. rows-100000) return a synthetic drawer history
+of N rows (API tabs "Sheet0".."Sheet7" map to gids 0-7); bodies are generated once per size and carry an ETag, so
+conditional requests get a 304. Latency (including slow /export stragglers) and
+error injection are configurable.
+
+    python -m bench.fake_sheets --port 8765 --latency-ms 50 --error-rate 0.05
+"""
+import re
+import io
+import csv
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import Counter
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+
+USERS = ["alice", "bob", "charlie", "dana", "eve", "frank", "grace", "heidi"]
+ACTIONS = ["removed", "returned"]
+PATH_RE = re.compile(r"^/spreadsheets/d/([A-Za-z0-9_-]+)/(export|gviz/tq)$")
+API_PATH_RE = re.compile(r"^/v4/spreadsheets/([A-Za-z0-9_-]+)(/values:batchGet)?$")
+GENERATED_TABS = 8
+
+
+def synthetic_history(rows: int, items: int = None, seed: int = 0) -> pd.DataFrame:
+    """A drawer history sheet: key, action, user, timestamp, location, note, extra."""
+    rng = np.random.default_rng(seed)
+    items = items or max(10, min(5000, rows // 20))
+    start = pd.Timestamp("2025-01-01")
+    return pd.DataFrame({
+        "Tool ID": rng.integers(1, items + 1, rows),
+        "Action": np.asarray(ACTIONS)[rng.integers(0, 2, rows)],
+        "User": np.asarray(USERS)[rng.integers(0, len(USERS), rows)],
+        "Timestamp": (start + pd.to_timedelta(np.sort(rng.integers(0, 300 * 86400, rows)), unit="s")).strftime("%Y-%m-%d %H:%M:%S"),
+        "Location": "LB 172",
+        "Note": "",
+        "Terminal": rng.integers(1, 4, rows),
+    })
+
+
+class FakeSheets:
+    """Holds generated bodies plus latency / error settings shared by all handlers."""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0,
+                 export_error_rate: float = 0, error_status: int = 500, seed: int = 0,
+                 export_slow_rate: float = 0, slow_ms: float = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.export_error_rate = export_error_rate
+        self.error_status = error_status
+        # Stragglers: this fraction of /export requests takes an extra slow_ms.
+        self.export_slow_rate = export_slow_rate
+        self.slow_ms = slow_ms
+        self.rng = random.Random(seed)
+        self.bodies = {}
+        self.extra = {}
+        self.requests = 0
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def set_sheet(self, doc_id: str, gid: str, df: pd.DataFrame):
+        """Serve df for (doc_id, gid) instead of a generated history."""
+        self.extra[(doc_id, gid)] = df
+        self.bodies.pop((doc_id, gid), None)
+
+    def body(self, doc_id: str, gid: str):
+        key = (doc_id, gid)
+        with self.lock:
+            cached = self.bodies.get(key)
+            if cached is None:
+                df = self.extra.get(key)
+                if df is None:
+                    m = re.fullmatch(r"rows-(\d+)", doc_id)
+                    if not m:
+                        return None, None
+                    df = synthetic_history(int(m.group(1)), seed=int(gid or 0))
+                data = df.to_csv(index=False).encode("utf-8")
+                cached = self.bodies[key] = (data, '"%s"' % hashlib.md5(data).hexdigest())
+            return cached
+
+    def tabs(self, doc_id: str) -> dict:
+        """gid -> tab title of a document, as the API metadata call reports it."""
+        gids = {gid for d, gid in self.extra if d == doc_id}
+        if re.fullmatch(r"rows-(\d+)", doc_id):
+            gids.update(str(i) for i in range(GENERATED_TABS))
+        return {gid: f"Sheet{gid}" for gid in sorted(gids, key=int)}
+
+    def values(self, doc_id: str, gid: str):
+        """A tab as API rows (lists of strings, header first)."""
+        data, _ = self.body(doc_id, gid)
+        return list(csv.reader(io.StringIO(data.decode("utf-8"))))
+
+    def should_fail(self, endpoint: str) -> bool:
+        rate = self.error_rate + (self.export_error_rate if endpoint == "export" else 0)
+        with self.lock:
+            return self.rng.random() < rate
+
+    def delay(self, endpoint: str = None):
+        with self.lock:
+            ms = self.latency_ms + (self.rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+            if endpoint == "export" and self.rng.random() < self.export_slow_rate:
+                ms += self.slow_ms
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Send headers and body in one write (avoids Nagle/delayed-ACK stalls).
+            wbufsize = 1 << 16
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def send_body(self, status, body=b"", headers=None, content_type="text/plain"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def send_json(self, status, payload):
+                self.send_body(status, json.dumps(payload).encode("utf-8"), content_type="application/json; charset=utf-8")
+
+            def do_api(self, doc_id, batch, query):
+                endpoint = "batchGet" if batch else "metadata"
+                with fake.lock:
+                    fake.calls[endpoint] += 1
+                fake.delay()
+                if fake.should_fail(endpoint):
+                    return self.send_json(fake.error_status, {"error": {"code": fake.error_status, "message": "injected error"}})
+                tabs = fake.tabs(doc_id)
+                if not tabs:
+                    return self.send_json(404, {"error": {"code": 404, "message": "Requested entity was not found."}})
+                if not batch:
+                    return self.send_json(200, {"spreadsheetId": doc_id, "sheets": [
+                        {"properties": {"sheetId": int(gid), "title": title}} for gid, title in tabs.items()]})
+                by_title = {title: gid for gid, title in tabs.items()}
+                ranges = []
+                for rng in query.get("ranges", []):
+                    title = rng.split("!")[0].strip("'").replace("''", "'")
+                    if title not in by_title:
+                        return self.send_json(400, {"error": {"code": 400, "message": f"Unable to parse range: {rng}"}})
+                    ranges.append({"range": rng, "majorDimension": "ROWS", "values": fake.values(doc_id, by_title[title])})
+                self.send_json(200, {"spreadsheetId": doc_id, "valueRanges": ranges})
+
+            def do_GET(self):
+                with fake.lock:
+                    fake.requests += 1
+                parsed = urlparse(self.path)
+                m = API_PATH_RE.match(parsed.path)
+                if m:
+                    return self.do_api(m.group(1), bool(m.group(2)), parse_qs(parsed.query))
+                m = PATH_RE.match(parsed.path)
+                if not m:
+                    return self.send_body(404, b"not found")
+                doc_id, endpoint = m.group(1), "gviz" if m.group(2) == "gviz/tq" else "export"
+                gid = parse_qs(parsed.query).get("gid", ["0"])[0]
+                fake.delay(endpoint)
+                if fake.should_fail(endpoint):
+                    return self.send_body(fake.error_status, b"<html>injected error</html>", content_type="text/html")
+                data, etag = fake.body(doc_id, gid)
+                if data is None:
+                    return self.send_body(404, b"<html>no such sheet</html>", content_type="text/html")
+                if self.headers.get("If-None-Match") == etag:
+                    return self.send_body(304, headers={"ETag": etag})
+                self.send_body(200, data, headers={"ETag": etag}, content_type="text/csv; charset=utf-8")
+
+        return Handler
+
+    def serve(self, host: str = "127.0.0.1", port: int = 0):
+        """Start serving in a daemon thread; returns (server, base_url)."""
+        server = ThreadingHTTPServer((host, port), self.handler())
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="fake-sheets", daemon=True).start()
+        return server, f"http://{host}:{server.server_address[1]}"
+
+
+def sheet_url(doc_id: str, gid: str = "0", service_account: bool = False) -> str:
+    """A Google-Sheets-style URL that fetch_sheet_csv maps onto the stand-in."""
+    prefix = "service_account:" if service_account else ""
+    return f"{prefix}https://docs.google.com/spreadsheets/d/{doc_id}/edit#gid={gid}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--export-error-rate", type=float, default=0, help="extra failure rate for /export only")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--export-slow-rate", type=float, default=0, help="fraction of /export requests that straggle")
+    parser.add_argument("--slow-ms", type=float, default=0, help="extra latency of a straggling request")
+    args = parser.parse_args()
+    fake = FakeSheets(args.latency_ms, args.jitter_ms, args.error_rate, args.export_error_rate, args.error_status,
+                      export_slow_rate=args.export_slow_rate, slow_ms=args.slow_ms)
+    server, base = fake.serve(args.host, args.port)
+    print(f"Serving fake sheets at {base} (set SHEETS_BASE_URL={base} and/or SHEETS_API_BASE_URL={base})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
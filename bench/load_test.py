@@ -0,0 +1,125 @@
+"""
+Multi-worker load test: N worker processes sharing one snapshot directory and
+inventory database, as when several Streamlit processes run behind a load balancer.
+
+Each worker starts the background sync (only one wins the leader lock) and then
+renders the Missing Items data path in a loop: read all drawer snapshots, update
+the removed-items trackers and page one Usage History view. Reported per worker
+count: total renders/s, scaling efficiency against one worker, and how many
+requests reached the (fake) Google Sheets server, which should not grow with
+the number of workers.
+
+    python -m bench.load_test --workers 1,2,4,8 --duration 10
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+DRAWERS = 7
+
+
+def drawer_urls():
+    from bench.fake_sheets import sheet_url
+    return {i: sheet_url(f"drawer-{i}") for i in range(1, DRAWERS + 1)}
+
+# -------------------------
+# Child: one worker process
+# -------------------------
+def run_worker(start_at: float, duration: float):
+    import sync
+    from drawers import DRAWER_SHEET_DTYPES
+    from history import get_tracker, get_view
+    from sheets import set_sheet_schema
+
+    urls = drawer_urls()
+    for url in urls.values():
+        set_sheet_schema(url, dtypes=DRAWER_SHEET_DTYPES)
+    sync.start_background_sync(list(urls.values()))
+    time.sleep(max(0.0, start_at - time.time()))
+
+    renders, errors, first_render = 0, 0, None
+    deadline = start_at + duration
+    while time.time() < deadline:
+        t = time.perf_counter()
+        for i, (df, used_url, status, snippet), meta in sync.read_sheets(urls):
+            if df is None:
+                errors += 1
+                continue
+            get_tracker(i).update(df)
+            if i == 1:
+                get_view(df).page(0, 100)
+        if first_render is None:
+            first_render = time.perf_counter() - t
+        renders += 1
+    return {"pid": os.getpid(), "renders": renders, "errors": errors, "leader": sync.is_sync_leader(),
+            "first_render_ms": round(first_render * 1000, 1) if first_render else None}
+
+# -------------------------
+# Parent: fake server, workers, report
+# -------------------------
+def run_round(workers: int, base_url: str, duration: float, rows: int):
+    shared = tempfile.mkdtemp(prefix="cloudportal-load-")
+    env = dict(os.environ, SHEETS_BASE_URL=base_url,
+               SNAPSHOT_DIR=os.path.join(shared, "snapshots"),
+               INVENTORY_DB_PATH=os.path.join(shared, "inventory.db"),
+               SHEET_SYNC_INTERVAL="5")
+    start_at = time.time() + 2.0 + 0.2 * workers  # let every worker finish importing
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    procs = [subprocess.Popen([sys.executable, "-m", "bench.load_test", "--child",
+                               "--start-at", str(start_at), "--duration", str(duration)],
+                              env=env, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+             for _ in range(workers)]
+    results = []
+    for p in procs:
+        out, err = p.communicate()
+        if p.returncode != 0:
+            print(f"worker failed:\n{err}", file=sys.stderr)
+            continue
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    shutil.rmtree(shared, ignore_errors=True)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker load test")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load per round")
+    parser.add_argument("--rows", type=int, default=20000, help="history rows per drawer sheet")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--start-at", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_worker(args.start_at, args.duration)))
+        return
+
+    from bench.fake_sheets import FakeSheets, synthetic_history
+    fake = FakeSheets(latency_ms=args.latency_ms)
+    for i in range(1, DRAWERS + 1):
+        fake.set_sheet(f"drawer-{i}", "0", synthetic_history(args.rows, seed=i))
+        fake.body(f"drawer-{i}", "0")
+    server, base_url = fake.serve()
+
+    print(f"{os.cpu_count()} CPUs, {DRAWERS} drawers x {args.rows} rows, {args.duration:.0f} s per round")
+    header = f"{'workers':>7} {'renders/s':>10} {'per worker':>11} {'scaling':>8} {'leaders':>8} {'errors':>7} {'sheet requests':>15}"
+    print(header)
+    print("-" * len(header))
+    base_rate = None
+    for workers in [int(w) for w in args.workers.split(",") if w.strip()]:
+        before = fake.requests
+        results = run_round(workers, base_url, args.duration, args.rows)
+        rate = sum(r["renders"] for r in results) / args.duration
+        base_rate = base_rate or (rate / workers if workers else None)
+        scaling = rate / (base_rate * workers) if base_rate else 0
+        print(f"{workers:>7} {rate:>10.1f} {rate / max(1, len(results)):>11.1f} {scaling:>7.0%} "
+              f"{sum(r['leader'] for r in results):>8} {sum(r['errors'] for r in results):>7} {fake.requests - before:>15}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Drawer registry: which drawers exist, the room each one is in, and where its
+history sheet and photo are.
+
+Read from DRAWER_CONFIG (drawers.json next to app.py by default). The app
+calls load_drawers on every rerun; the file is parsed again only when its
+mtime changes, so edits are picked up without a restart:
+
+    {"drawers": [
+        {"id": 1, "name": "Drawer 1", "room": "Main",
+         "url": "https://docs.google.com/spreadsheets/d/<doc>/edit#gid=0",
+         "image": "tools-drawer1.jpg"},
+        ...
+    ]}
+
+Only "id" is required. "name" defaults to "Drawer <id>", "room" to
+"Unassigned", and a drawer without a "url" is listed but has no history.
+"""
+import os
+import re
+import json
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DRAWER_CONFIG = os.environ.get("DRAWER_CONFIG", os.path.join(APP_DIR, "drawers.json"))
+DEFAULT_ROOM = "Unassigned"
+
+# Drawer history sheets: column 1 is the item key, column 2 the action; user and
+# timestamp columns are found by header. Typed once at ingest (see
+# sheets.set_sheet_schema) and kept in the Arrow snapshots.
+USER_COLUMN_RE = re.compile(r"user|person|operator|who|\bby\b", re.I)
+TIME_COLUMN_RE = re.compile(r"time|date|when", re.I)
+DRAWER_SHEET_DTYPES = {
+    0: "Int32",
+    1: "category",
+    USER_COLUMN_RE.pattern: "category",
+    TIME_COLUMN_RE.pattern: "datetime64[ns]",
+}
+
+
+_memo = {}  # path -> (mtime_ns, drawers)
+
+def load_drawers(path: str = DRAWER_CONFIG) -> dict:
+    """
+    drawer id -> {"id", "name", "room", "url", "image"}, in id order; {} if the file doesn't exist.
+    The same dict is returned until the file changes: treat it as read-only.
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    cached = _memo.get(path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return {}
+    drawers = parse_drawers(config, path)
+    _memo[path] = (mtime_ns, drawers)
+    return drawers
+
+_applied = {"drawers": None}
+
+def drawers_changed(drawers: dict) -> bool:
+    """
+    True the first time this registry dict is seen in the process, i.e. at
+    startup and after drawers.json changed; per-drawer setup runs only then.
+    """
+    if _applied["drawers"] is drawers:
+        return False
+    _applied["drawers"] = drawers
+    return True
+
+def parse_drawers(config, path: str) -> dict:
+    """Validate a decoded drawers.json (path is only used in error messages)."""
+    entries = config.get("drawers", []) if isinstance(config, dict) else config
+    drawers = {}
+    for n, entry in enumerate(entries):
+        try:
+            drawer_id = int(entry["id"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{path}: drawer entry {n} needs an integer \"id\"") from None
+        if drawer_id in drawers:
+            raise ValueError(f"{path}: drawer id {drawer_id} is listed twice")
+        drawers[drawer_id] = {
+            "id": drawer_id,
+            "name": entry.get("name") or f"Drawer {drawer_id}",
+            "room": entry.get("room") or DEFAULT_ROOM,
+            "url": entry.get("url"),
+            "image": entry.get("image"),
+        }
+    return dict(sorted(drawers.items()))
+
+def rooms(drawers: dict) -> list:
+    return sorted({d["room"] for d in drawers.values()})
+
+def drawers_in_room(drawers: dict, room: str = None) -> list:
+    """Drawer ids in the room (all drawers when room is None), in id order."""
+    return [i for i, d in drawers.items() if room is None or d["room"] == room]
@@ -0,0 +1,101 @@
+"""
+Lazily generated, cached data exports (CSV, gzipped CSV, Parquet).
+
+Exports are written to EXPORT_DIR in chunks, so a large table never has to
+be serialized into one in-memory string, and are keyed by the data's version,
+so downloading unchanged data again reuses the file already on disk.
+"""
+import os
+import gzip
+import glob
+import hashlib
+import threading
+
+from metrics import metrics
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+EXPORT_DIR = os.environ.get("EXPORT_DIR", os.path.join(APP_DIR, "data", "exports"))
+CHUNK_ROWS = 50_000
+
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "CSV (gzip)": ("csv.gz", "application/gzip"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+_lock = threading.Lock()
+
+
+def frame_chunks(df, chunk_rows: int = CHUNK_ROWS):
+    """Yield row slices of df (views, not copies)."""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+    if len(df) == 0:
+        yield df
+
+def write_csv(path: str, chunks, compress: bool = False):
+    opener = gzip.open if compress else open
+    with opener(path, "wt", encoding="utf-8", newline="") as f:
+        header = True
+        for chunk in chunks:
+            chunk.to_csv(f, index=False, header=header)
+            header = False
+
+def write_parquet(path: str, chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+def export_path(source: str, version, fmt: str) -> str:
+    ext = FORMATS[fmt][0]
+    tag = hashlib.sha1(repr(version).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(EXPORT_DIR, f"{source}-{tag}.{ext}")
+
+def export_file(source: str, version, fmt: str, chunks_fn) -> str:
+    """
+    Path of the export of `source` at `version` in format `fmt`, written from
+    chunks_fn() (an iterable of DataFrames) only if it doesn't exist yet.
+    Older versions of the same source/format are removed.
+    """
+    path = export_path(source, version, fmt)
+    if os.path.exists(path):
+        metrics.inc("exports_total", source=source, result="cached")
+        return path
+    with _lock:
+        if os.path.exists(path):
+            return path
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with metrics.timer("export_write_seconds", source=source, format=FORMATS[fmt][0]):
+            if fmt == "Parquet":
+                write_parquet(tmp, chunks_fn())
+            else:
+                write_csv(tmp, chunks_fn(), compress=(fmt == "CSV (gzip)"))
+        os.replace(tmp, path)
+        metrics.inc("exports_total", source=source, result="written")
+        ext = FORMATS[fmt][0]
+        for old in glob.glob(os.path.join(EXPORT_DIR, f"{glob.escape(source)}-*.{ext}")):
+            if old != path:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+        return path
+
+def deferred_downloads_supported() -> bool:
+    """Whether st.download_button accepts a callable (generate-on-click) for data."""
+    try:
+        from streamlit.runtime.media_file_manager import MediaFileManager
+    except ImportError:
+        return False
+    return hasattr(MediaFileManager, "add_deferred")
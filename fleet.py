@@ -0,0 +1,112 @@
+"""
+Fleet view: one typed event table across every drawer plus the aggregations
+for the summary dashboard.
+
+Drawer sheets only guarantee column 1 = item key and column 2 = action; user
+and timestamp columns are picked by header name when present.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from drawers import USER_COLUMN_RE, TIME_COLUMN_RE
+from history import action_mask, removed_mask
+
+ACTIONS = ["removed", "returned", "other"]
+
+_memo = {"frames": None, "summary": None}
+_memo_lock = threading.Lock()
+
+
+def find_column(df: pd.DataFrame, pattern, skip: int = 2):
+    """First column after the key/action columns whose header matches pattern."""
+    for col in df.columns[skip:]:
+        if pattern.search(str(col)):
+            return col
+    return None
+
+def drawer_events(drawer_id, df: pd.DataFrame) -> pd.DataFrame:
+    """Normalize one drawer sheet to the fleet event schema."""
+    n = len(df)
+    # Keys keep their sheet values (as history.py does), so "A1" or 1.5 count here
+    # exactly as in Missing Items; typed integer keys stay integers.
+    key = df.iloc[:, 0]
+    key = key.astype("Int64") if pd.api.types.is_integer_dtype(key.dtype) else key.astype(object)
+    action_raw = df.iloc[:, 1]
+    returned = action_mask(action_raw, "return").to_numpy()
+    removed = removed_mask(action_raw).to_numpy()
+    action = np.where(removed, 0, np.where(returned, 1, 2))
+    user_col = find_column(df, USER_COLUMN_RE)
+    time_col = find_column(df, TIME_COLUMN_RE)
+    return pd.DataFrame({
+        "drawer": np.full(n, drawer_id, dtype=np.int32),
+        "seq": np.arange(n, dtype=np.int32),
+        "key": key.to_numpy(),
+        "action": pd.Categorical.from_codes(action, categories=ACTIONS),
+        "user": (df[user_col].astype("string") if user_col is not None else pd.Series(pd.NA, index=df.index, dtype="string")).to_numpy(),
+        "timestamp": (pd.to_datetime(df[time_col], errors="coerce") if time_col is not None else pd.Series(pd.NaT, index=df.index)).to_numpy(),
+    })
+
+def build_event_table(frames: dict) -> pd.DataFrame:
+    """All drawers' events in one frame (drawer id -> sheet DataFrame), typed once."""
+    parts = [drawer_events(d, df) for d, df in frames.items() if df is not None and df.shape[1] >= 2]
+    if not parts:
+        return pd.DataFrame({"drawer": pd.Series(dtype=np.int32), "seq": pd.Series(dtype=np.int32),
+                             "key": pd.Series(dtype="Int64"), "action": pd.Categorical([], categories=ACTIONS),
+                             "user": pd.Series(dtype="string"), "timestamp": pd.Series(dtype="datetime64[ns]")})
+    events = pd.concat(parts, ignore_index=True)
+    events["user"] = events["user"].astype("category")
+    events = events[events["key"].notna()].reset_index(drop=True)
+    return events
+
+def summarize(events: pd.DataFrame, top_n: int = 10) -> dict:
+    """Vectorized fleet aggregations over the event table."""
+    is_removed = events["action"] == "removed"
+
+    last = events.drop_duplicates(["drawer", "key"], keep="last")
+    removed_now = (last[last["action"] == "removed"].groupby("drawer").size()
+                   .rename("currently_removed").reset_index())
+
+    removals = events[is_removed]
+    per_user_day = pd.DataFrame(columns=["user", "day", "removals"])
+    if removals["timestamp"].notna().any():
+        per_user_day = (removals.assign(day=removals["timestamp"].dt.floor("D"),
+                                        user=removals["user"].astype("string").fillna("(unknown)"))
+                        .dropna(subset=["day"])
+                        .groupby(["user", "day"]).size().rename("removals").reset_index())
+
+    # Checkout duration: a removal followed (for the same drawer/key) by a return.
+    nxt = events.groupby(["drawer", "key"], sort=False)[["action", "timestamp"]].shift(-1)
+    closed = is_removed & (nxt["action"] == "returned")
+    durations = (nxt["timestamp"] - events["timestamp"])[closed].dropna()
+    checkout = (durations.dt.total_seconds().div(3600).groupby(events.loc[durations.index, "drawer"])
+                .agg(["mean", "count"]).rename(columns={"mean": "mean_hours", "count": "checkouts"}).reset_index())
+
+    top_tools = (removals.groupby(["drawer", "key"], sort=False).size().rename("removals")
+                 .nlargest(top_n).reset_index())
+    top_tools["tool"] = "D" + top_tools["drawer"].astype(str) + " #" + top_tools["key"].astype(str)
+
+    return {
+        "events": len(events),
+        "drawers": int(events["drawer"].nunique()),
+        "removed_now": removed_now,
+        "per_user_day": per_user_day,
+        "checkout": checkout,
+        "mean_checkout_hours": float(durations.dt.total_seconds().mean() / 3600) if len(durations) else None,
+        "top_tools": top_tools,
+    }
+
+def fleet_summary(frames: dict) -> dict:
+    """
+    summarize(build_event_table(frames)), recomputed only when any drawer's frame
+    object changes (i.e. after a data refresh), not on every widget interaction.
+    """
+    with _memo_lock:
+        prev = _memo["frames"]
+        if prev is not None and prev.keys() == frames.keys() and all(prev[k] is frames[k] for k in frames):
+            return _memo["summary"]
+        summary = summarize(build_event_table(frames))
+        _memo["frames"] = dict(frames)
+        _memo["summary"] = summary
+        return summary
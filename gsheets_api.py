@@ -0,0 +1,114 @@
+"""
+Service-account backend for private Google Sheets (Sheets API v4 through gspread).
+
+One authorized session with a pooled connection adapter is shared by every
+fetch. All tabs requested from the same spreadsheet are read with a single
+values:batchGet call; the gid -> tab title mapping each call needs is cached
+per spreadsheet.
+
+Credentials come from GOOGLE_SERVICE_ACCOUNT_FILE (or
+GOOGLE_APPLICATION_CREDENTIALS). SHEETS_API_BASE_URL points the client at a
+local fake of the API (see bench/fake_sheets.py); the fake needs no credentials.
+"""
+import os
+import csv
+import io
+import threading
+
+import gspread
+from gspread.urls import SPREADSHEETS_API_V4_BASE_URL
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport.requests import AuthorizedSession
+from requests.adapters import HTTPAdapter
+
+SERVICE_ACCOUNT_FILE = os.environ.get("GOOGLE_SERVICE_ACCOUNT_FILE") or os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+SHEETS_API_BASE_URL = os.environ.get("SHEETS_API_BASE_URL", "").rstrip("/")
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+API_HOST = "https://sheets.googleapis.com"
+API_TIMEOUT = 20
+POOL_SIZE = 16
+
+_client = None
+_titles = {}
+_lock = threading.Lock()
+
+
+class RebaseAdapter(HTTPAdapter):
+    """Sends requests meant for the Sheets API host to another base URL (a local fake)."""
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        if request.url.startswith(API_HOST):
+            request.url = self.base_url + request.url[len(API_HOST):]
+        return super().send(request, **kwargs)
+
+
+def get_client() -> gspread.HTTPClient:
+    """The process-wide authorized client (created on first use)."""
+    global _client
+    with _lock:
+        if _client is None:
+            if SHEETS_API_BASE_URL and not SERVICE_ACCOUNT_FILE:
+                credentials = AnonymousCredentials()
+            elif SERVICE_ACCOUNT_FILE:
+                from google.oauth2.service_account import Credentials
+                credentials = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
+            else:
+                raise RuntimeError("No service account configured: set GOOGLE_SERVICE_ACCOUNT_FILE.")
+            session = AuthorizedSession(credentials)
+            if SHEETS_API_BASE_URL:
+                adapter = RebaseAdapter(SHEETS_API_BASE_URL, pool_connections=4, pool_maxsize=POOL_SIZE)
+            else:
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            client = gspread.HTTPClient(auth=None, session=session)
+            client.set_timeout(API_TIMEOUT)
+            _client = client
+        return _client
+
+def sheet_titles(doc_id: str, refresh: bool = False) -> dict:
+    """gid -> tab title for a spreadsheet (one metadata call, then cached)."""
+    titles = _titles.get(doc_id)
+    if titles is None or refresh:
+        meta = get_client().fetch_sheet_metadata(doc_id, params={"fields": "sheets.properties(sheetId,title)"})
+        titles = {str(s["properties"]["sheetId"]): s["properties"]["title"] for s in meta.get("sheets", [])}
+        _titles[doc_id] = titles
+    return titles
+
+def a1_range(title: str) -> str:
+    return "'" + title.replace("'", "''") + "'"
+
+def batch_get(doc_id: str, gids) -> dict:
+    """
+    Values of several tabs of one spreadsheet in a single values:batchGet call.
+    Returns gid -> list of rows; unknown gids map to None.
+    """
+    titles = sheet_titles(doc_id)
+    if any(str(g) not in titles for g in gids):
+        titles = sheet_titles(doc_id, refresh=True)
+    wanted = [str(g) for g in gids if str(g) in titles]
+    out = {str(g): None for g in gids}
+    if not wanted:
+        return out
+    resp = get_client().values_batch_get(doc_id, [a1_range(titles[g]) for g in wanted])
+    for gid, value_range in zip(wanted, resp.get("valueRanges", [])):
+        out[gid] = value_range.get("values", [])
+    return out
+
+def values_to_csv(values) -> bytes:
+    """Rows as returned by the API (ragged, header first) -> CSV bytes."""
+    width = max((len(r) for r in values), default=0)
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    for row in values:
+        writer.writerow(list(row) + [""] * (width - len(row)))
+    return buf.getvalue().encode("utf-8")
+
+def error_status(exc):
+    """HTTP status of a gspread APIError, if any."""
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
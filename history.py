@@ -0,0 +1,211 @@
+"""
+Drawer history analysis: which items are currently removed from a drawer.
+
+A drawer sheet is an append-only log where column 1 is the item key and
+column 2 the action. An item is currently removed when its *last* entry's
+action contains "removed".
+"""
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+
+def action_mask(actions: pd.Series, word: str) -> pd.Series:
+    """
+    Boolean mask of actions containing word (case-insensitive).
+    The string test runs once per distinct action value, not once per row;
+    categorical columns (the drawer schema) reuse their codes directly.
+    """
+    if isinstance(actions.dtype, pd.CategoricalDtype):
+        codes, uniques = actions.cat.codes.to_numpy(), actions.cat.categories
+    else:
+        codes, uniques = pd.factorize(actions, use_na_sentinel=True)
+    # Append False for the NA sentinel (-1) so it can be indexed directly.
+    hit = pd.Series(uniques).astype(str).str.lower().str.contains(word, regex=False, na=False).tolist() + [False]
+    return pd.Series(np.asarray(hit, dtype=bool)[codes], index=actions.index)
+
+def removed_mask(actions: pd.Series) -> pd.Series:
+    return action_mask(actions, "removed")
+
+def last_rows_per_key(df: pd.DataFrame, key_col) -> pd.DataFrame:
+    """Last row per item key, in file order. Rows with an empty key are ignored."""
+    keyed = df[df[key_col].notna()]
+    return keyed.drop_duplicates(subset=key_col, keep="last")
+
+def numeric_keys(keys: pd.Series) -> pd.Series:
+    """Item keys as numbers (NaN where unparseable); typed integer keys pass through."""
+    if pd.api.types.is_integer_dtype(keys.dtype):
+        return keys
+    return pd.to_numeric(keys, errors="coerce")
+
+def sort_by_key(df: pd.DataFrame) -> pd.DataFrame:
+    """Usage History order: numeric item key ascending, unparseable keys last."""
+    first_col = df.columns[0]
+    # df may be shared through the sheet cache, so don't modify it in place
+    df = df.assign(**{first_col: numeric_keys(df[first_col])})
+    return df.sort_values(by=first_col, ascending=True, na_position="last").reset_index(drop=True)
+
+def key_order(df: pd.DataFrame) -> np.ndarray:
+    """Row positions in sort_by_key order (stable; unparseable keys last)."""
+    keys = numeric_keys(df.iloc[:, 0])
+    if pd.api.types.is_integer_dtype(keys.dtype) and not keys.hasnans:
+        return np.argsort(keys.to_numpy(dtype=keys.dtype.numpy_dtype), kind="stable")
+    return np.argsort(keys.to_numpy(dtype="float64", na_value=np.nan), kind="stable")
+
+def currently_removed_items(df: pd.DataFrame) -> pd.DataFrame:
+    """Full (non-incremental) computation; df must have at least 2 columns."""
+    first_col, second_col = df.columns[0], df.columns[1]
+    last_rows = last_rows_per_key(df, first_col)
+    return last_rows[removed_mask(last_rows[second_col])].reset_index(drop=True)
+
+
+class SheetView:
+    """
+    Server-side paging over one sheet frame. The key sort order and recent text
+    filters are computed once per frame and reused until the frame is replaced
+    (i.e. the sheet changed), so each rerun only slices out the visible page.
+    """
+
+    MAX_FILTERS = 8
+
+    def __init__(self, df: pd.DataFrame, search_cols: int = 6):
+        self.df = df
+        self.search_cols = search_cols
+        self._order = None
+        self._sorted = None
+        self._filters = {}
+        self._lock = threading.Lock()
+
+    def order(self) -> np.ndarray:
+        with self._lock:
+            if self._order is None:
+                self._order = key_order(self.df)
+            return self._order
+
+    def sorted_frame(self) -> pd.DataFrame:
+        """The whole sheet in key order, as sort_by_key returns it (memoized)."""
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sort_by_key(self.df)
+            return self._sorted
+
+    def matching(self, query: str) -> np.ndarray:
+        """Boolean row mask: query is a case-insensitive substring of any searched column."""
+        query = query.strip().lower()
+        with self._lock:
+            mask = self._filters.get(query)
+            if mask is not None:
+                return mask
+        mask = np.zeros(len(self.df), dtype=bool)
+        for col in self.df.columns[:self.search_cols]:
+            mask |= action_mask(self.df[col], query).to_numpy()
+        with self._lock:
+            if len(self._filters) >= self.MAX_FILTERS:
+                self._filters.pop(next(iter(self._filters)))
+            self._filters[query] = mask
+        return mask
+
+    def count(self, query: str = None) -> int:
+        if query and query.strip():
+            return int(self.matching(query).sum())
+        return len(self.df)
+
+    def page(self, offset: int = 0, limit: int = 100, query: str = None):
+        """Return (rows offset..offset+limit in key order, matching row count)."""
+        positions = self.order()
+        if query and query.strip():
+            positions = positions[self.matching(query)[positions]]
+        page = self.df.iloc[positions[offset:offset + limit]]
+        first_col = page.columns[0]
+        page = page.assign(**{first_col: numeric_keys(page[first_col])})
+        return page.reset_index(drop=True), len(positions)
+
+
+_views = {}
+_views_lock = threading.Lock()
+
+def get_view(df: pd.DataFrame) -> SheetView:
+    """The SheetView for this frame object, shared by every session while the frame lives."""
+    with _views_lock:
+        for key in [k for k, (ref, _) in _views.items() if ref() is None]:
+            del _views[key]
+        entry = _views.get(id(df))
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+        view = SheetView(df)
+        _views[id(df)] = (weakref.ref(df), view)
+        return view
+
+
+class RemovedItemsTracker:
+    """
+    Incremental "currently removed" state for one drawer sheet.
+
+    Keeps the row position of each key's last action plus the set of keys whose
+    last action is a removal. On update only rows appended since the previous
+    call are processed, so a refresh costs O(new rows). If the sheet no longer
+    looks like an append of what was seen before (columns changed, rows deleted
+    or the last processed row edited) the state is rebuilt from scratch.
+    """
+
+    def __init__(self):
+        self.columns = None
+        self.rows_seen = 0
+        self.last_row = None
+        self.last_pos = {}
+        self.removed = set()
+        self._lock = threading.Lock()
+
+    def reset(self):
+        self.columns = None
+        self.rows_seen = 0
+        self.last_row = None
+        self.last_pos = {}
+        self.removed = set()
+
+    def is_append_of_seen(self, df: pd.DataFrame) -> bool:
+        if self.columns is None or list(df.columns) != self.columns or len(df) < self.rows_seen:
+            return False
+        if self.rows_seen == 0:
+            return True
+        row = tuple(df.iloc[self.rows_seen - 1, :2])
+        return all(a == b or (pd.isna(a) and pd.isna(b)) for a, b in zip(row, self.last_row))
+
+    def update(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Process newly appended rows of df and return its currently removed rows."""
+        with self._lock:
+            if not self.is_append_of_seen(df):
+                self.reset()
+                self.columns = list(df.columns)
+
+            if len(df) > self.rows_seen:
+                new = df.iloc[self.rows_seen:, :2]
+                positions = np.arange(self.rows_seen, len(df))
+                keep = (new.iloc[:, 0].notna() & ~new.iloc[:, 0].duplicated(keep="last")).to_numpy()
+                last_new = new[keep]
+                is_removed = removed_mask(last_new.iloc[:, 1]).to_numpy()
+                for key, pos, rem in zip(last_new.iloc[:, 0].tolist(), positions[keep].tolist(), is_removed.tolist()):
+                    self.last_pos[key] = pos
+                    if rem:
+                        self.removed.add(key)
+                    else:
+                        self.removed.discard(key)
+                self.rows_seen = len(df)
+                self.last_row = tuple(df.iloc[-1, :2])
+
+            positions = sorted(self.last_pos[k] for k in self.removed)
+            return df.iloc[positions].reset_index(drop=True)
+
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+def get_tracker(drawer_id) -> RemovedItemsTracker:
+    """Process-wide tracker per drawer, shared by every session."""
+    with _trackers_lock:
+        tracker = _trackers.get(drawer_id)
+        if tracker is None:
+            tracker = _trackers[drawer_id] = RemovedItemsTracker()
+        return tracker
@@ -0,0 +1,170 @@
+"""
+Lightweight in-process instrumentation: counters and latency histograms.
+
+Everything is recorded into the process-wide `metrics` registry and can be
+exported as Prometheus text or JSON lines (see the Diagnostics section of the
+Admin Panel). Set METRICS_PORT to also serve /metrics for a Prometheus scraper.
+"""
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float):
+        """Upper bound of the bucket holding the q-quantile (None if empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+def label_text(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in labels) + "}"
+
+
+class Metrics:
+    """Thread-safe registry of counters and histograms keyed by (name, labels)."""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the duration of the with-block (in seconds) into histogram `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started_at = time.time()
+
+    def rows(self):
+        """Flat summary rows (one per series) for display."""
+        with self._lock:
+            out = []
+            for (name, labels), value in sorted(self.counters.items()):
+                out.append({"metric": name, "labels": label_text(labels), "count": value,
+                            "mean_ms": None, "p50_ms": None, "p95_ms": None, "p99_ms": None})
+            for (name, labels), h in sorted(self.histograms.items()):
+                ms = lambda v: None if v is None else round(v * 1000, 1)
+                out.append({"metric": name, "labels": label_text(labels), "count": h.count,
+                            "mean_ms": ms(h.sum / h.count if h.count else None),
+                            "p50_ms": ms(h.quantile(0.5)), "p95_ms": ms(h.quantile(0.95)), "p99_ms": ms(h.quantile(0.99))})
+            return out
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            seen = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} counter")
+                    seen.add(name)
+                lines.append(f"{name}{label_text(labels)} {value}")
+            for (name, labels), h in sorted(self.histograms.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} histogram")
+                    seen.add(name)
+                cumulative = 0
+                for bound, n in zip(h.buckets + (float("inf"),), h.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{label_text(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{label_text(labels)} {h.sum}")
+                lines.append(f"{name}_count{label_text(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_json_lines(self) -> str:
+        """One JSON object per series, stamped with the export time."""
+        now = time.time()
+        with self._lock:
+            lines = []
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append({"ts": now, "metric": name, "labels": dict(labels), "type": "counter", "value": value})
+            for (name, labels), h in sorted(self.histograms.items()):
+                lines.append({"ts": now, "metric": name, "labels": dict(labels), "type": "histogram",
+                              "count": h.count, "sum": h.sum, "buckets": list(h.buckets), "bucket_counts": list(h.counts)})
+        return "".join(json.dumps(line) + "\n" for line in lines)
+
+
+metrics = Metrics()
+
+# -------------------------
+# Optional /metrics endpoint
+# -------------------------
+_server = None
+
+def start_metrics_server(port: int = None):
+    """Serve Prometheus text on http://0.0.0.0:<port>/metrics (once per process)."""
+    global _server
+    port = port or int(os.environ.get("METRICS_PORT", "0") or 0)
+    if not port or _server is not None:
+        return _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            found = self.path.split("?")[0] == "/metrics"
+            body = metrics.to_prometheus().encode("utf-8") if found else b""
+            self.send_response(200 if found else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        _server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    except OSError:
+        return None  # another worker process already serves this port
+    threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
@@ -0,0 +1,182 @@
+"""
+Cross-drawer tool search: an in-memory inverted index over tool IDs and names.
+
+One document per (drawer, tool key) holds that tool's last action, user and
+time, plus one per inventory item, marked out (and by whom) from the usage
+log's current state. Tokens (the ID and lower-cased name words)
+map to document ids, and a sorted vocabulary makes prefix lookups a bisect, so
+a query costs O(matching postings) regardless of how many drawers exist.
+
+The index is refreshed from the local snapshots only (never by fetching): a
+drawer is re-indexed when its snapshot version changes, and the inventory
+when the store's data version or the usage log's last event changes, so a
+quiet refresh is one stat per drawer.
+"""
+import os
+import re
+import time
+import bisect
+import heapq
+import threading
+
+from metrics import metrics
+
+SEARCH_REFRESH_INTERVAL = float(os.environ.get("SEARCH_REFRESH_INTERVAL", "2"))
+NAME_COLUMN_RE = re.compile(r"name|tool|item|description", re.I)
+TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+
+def tokens(text) -> set:
+    return set(TOKEN_RE.findall(str(text).lower())) if text is not None else set()
+
+
+class ToolIndex:
+    """Documents plus token -> document-id postings; drawers and the inventory are replaced independently."""
+
+    def __init__(self):
+        self.docs = {}        # doc id -> record dict
+        self.postings = {}    # token -> set of doc ids
+        self.by_source = {}   # ("drawer", id) / ("inventory", None) -> doc ids
+        self.versions = {}    # same keys -> version last indexed
+        self.vocab = []
+        self.vocab_dirty = False
+        self.next_id = 0
+        self.refreshed_at = 0.0
+        self._lock = threading.RLock()
+
+    # ---- indexing ----
+    def replace(self, source, records, version=None):
+        """Swap in the documents for one source: (record, tokens) pairs."""
+        with self._lock:
+            for doc_id in self.by_source.pop(source, ()):
+                for tok in self.docs.pop(doc_id)["_tokens"]:
+                    ids = self.postings.get(tok)
+                    if ids is not None:
+                        ids.discard(doc_id)
+                        if not ids:
+                            del self.postings[tok]
+            ids = []
+            for record, toks in records:
+                doc_id = self.next_id
+                self.next_id += 1
+                record["_tokens"] = toks
+                self.docs[doc_id] = record
+                for tok in toks:
+                    self.postings.setdefault(tok, set()).add(doc_id)
+                ids.append(doc_id)
+            self.by_source[source] = ids
+            self.versions[source] = version
+            self.vocab_dirty = True
+
+    def index_drawer(self, drawer_id, df, version=None):
+        """Index the last row per tool key of one drawer sheet (key column 1, action column 2)."""
+        import pandas as pd
+        from fleet import find_column, USER_COLUMN_RE, TIME_COLUMN_RE
+        from history import removed_mask
+
+        def column(col):
+            if col is None:
+                return [None] * len(last)
+            return [None if pd.isna(v) else v for v in last[col].tolist()]
+
+        records = []
+        if df is not None and df.shape[1] >= 2:
+            last = df[df.iloc[:, 0].notna()].drop_duplicates(df.columns[0], keep="last")
+            name_col = find_column(last, NAME_COLUMN_RE)
+            user_col = find_column(last, USER_COLUMN_RE)
+            time_col = find_column(last, TIME_COLUMN_RE)
+            out = removed_mask(last.iloc[:, 1]).tolist()
+            for key, action, name, user, when, is_out in zip(last.iloc[:, 0].tolist(), column(last.columns[1]),
+                                                              column(name_col), column(user_col), column(time_col), out):
+                records.append(({"source": "drawer", "drawer": drawer_id, "key": key, "name": name,
+                                 "action": action, "user": user, "when": when, "out": is_out},
+                                tokens(key) | tokens(name)))
+        with metrics.timer("search_index_seconds", source="drawer"):
+            self.replace(("drawer", drawer_id), records, version)
+
+    def index_inventory(self, chunks, holders=None, version=None):
+        """
+        Index inventory rows (id, name, location, status) from an iterable of
+        DataFrames. holders (item id -> usage-log state, see UsageLog.state)
+        says which items are checked out or reported missing right now.
+        """
+        holders = holders or {}
+        records = []
+        for chunk in chunks:
+            for row in chunk.to_dict("records"):
+                held = holders.get(int(row["id"]))
+                records.append(({"source": "inventory", "drawer": None, "key": row["id"], "name": row["name"],
+                                 "location": row["location"], "status": row["status"], "out": held is not None,
+                                 "user": held["user"] if held else None, "action": held["action"] if held else None},
+                                tokens(row["id"]) | tokens(row["name"])))
+        with metrics.timer("search_index_seconds", source="inventory"):
+            self.replace(("inventory", None), records, version)
+
+    def refresh(self, drawer_urls: dict, store=None, usage=None, force: bool = False):
+        """Re-index drawers whose snapshot changed, and the inventory if the store's data or the usage log changed."""
+        from sync import load_snapshot, snapshot_version
+
+        if not force and time.time() - self.refreshed_at < SEARCH_REFRESH_INTERVAL:
+            return
+        with self._lock:
+            for drawer_id, url in drawer_urls.items():
+                version = snapshot_version(url)
+                if version is not None and self.versions.get(("drawer", drawer_id)) != version:
+                    df, _ = load_snapshot(url)
+                    self.index_drawer(drawer_id, df, version)
+            for source in [s for s in self.by_source if s[0] == "drawer" and s[1] not in drawer_urls]:
+                self.replace(source, [])
+                del self.by_source[source], self.versions[source]
+            if store is not None:
+                holders, last_event_id = None, None
+                if usage is not None:
+                    usage.maybe_catch_up()
+                    with usage.state_lock:
+                        holders, last_event_id = dict(usage.state), usage.last_event_id
+                version = (store.data_version(), last_event_id)
+                if self.versions.get(("inventory", None)) != version:
+                    self.index_inventory(store.iter_items(), holders, version)
+            self.refreshed_at = time.time()
+
+    # ---- lookup ----
+    def matching(self, token: str) -> dict:
+        """doc id -> weight for every indexed token starting with `token` (2 for an exact match)."""
+        if self.vocab_dirty:
+            self.vocab = sorted(self.postings)
+            self.vocab_dirty = False
+        found = {}
+        start = bisect.bisect_left(self.vocab, token)
+        for tok in self.vocab[start:bisect.bisect_left(self.vocab, token + "\uffff")]:
+            weight = 2 if tok == token else 1
+            for doc_id in self.postings[tok]:
+                if found.get(doc_id, 0) < weight:
+                    found[doc_id] = weight
+        return found
+
+    def search(self, query: str, limit: int = 20) -> list:
+        """Documents matching every query word (as a prefix), exact matches first."""
+        words = sorted(tokens(query), key=len, reverse=True)
+        if not words:
+            return []
+        with metrics.timer("search_query_seconds"), self._lock:
+            scores = self.matching(words[0])
+            for word in words[1:]:
+                if not scores:
+                    break
+                more = self.matching(word)
+                scores = {d: s + more[d] for d, s in scores.items() if d in more}
+            ranked = heapq.nsmallest(limit, scores, key=lambda d: (-scores[d], self.docs[d]["drawer"] is None,
+                                                                   self.docs[d]["drawer"] or 0, str(self.docs[d]["key"])))
+            return [{k: v for k, v in self.docs[d].items() if k != "_tokens"} for d in ranked]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index() -> ToolIndex:
+    """Process-wide search index, shared by every session."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ToolIndex()
+        return _index
@@ -0,0 +1,702 @@
+"""
+Google Sheets CSV fetching helpers.
+
+Kept out of app.py so module-level state (the pooled HTTP session, the fetch
+thread pool and the sheet cache) survives Streamlit reruns and is shared by
+every session instead of being rebuilt on every run.
+"""
+import os
+import re
+import time
+import threading
+import io
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+from metrics import metrics
+
+# pandas and requests are imported on first fetch, not here, so panes that only
+# need URL helpers or the sheet registry don't pay for them.
+
+FETCH_CONNECT_TIMEOUT = float(os.environ.get("SHEET_FETCH_CONNECT_TIMEOUT", "3.05"))
+FETCH_TIMEOUT = float(os.environ.get("SHEET_FETCH_TIMEOUT", "20"))
+MAX_FETCH_WORKERS = 8
+STREAM_CHUNK_BYTES = 64 * 1024
+SNIPPET_CHARS = 800
+SERVICE_ACCOUNT_PREFIX = "service_account:"
+
+# Overridable so benchmarks can point at a local stand-in (bench/fake_sheets.py).
+SHEETS_BASE_URL = os.environ.get("SHEETS_BASE_URL", "https://docs.google.com").rstrip("/")
+
+# Cached sheets younger than this are served without touching the network;
+# older ones are revalidated with If-None-Match / If-Modified-Since.
+SHEET_CACHE_TTL = float(os.environ.get("SHEET_CACHE_TTL", "60"))
+SHEET_CACHE_MAX_BYTES = int(os.environ.get("SHEET_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Hedging: when an endpoint hasn't answered within its recent p95 (or
+# HEDGE_DEFAULT_DELAY until enough samples exist), the next endpoint is tried in parallel.
+HEDGING_ENABLED = os.environ.get("SHEET_HEDGING", "1") != "0"
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.25
+HEDGE_DEFAULT_DELAY = float(os.environ.get("SHEET_HEDGE_DELAY", "2"))
+# Circuit breaker: after this many consecutive failures (errors, 429, 5xx) an
+# endpoint is skipped for a cooldown that doubles while it keeps failing.
+BREAKER_THRESHOLD = int(os.environ.get("SHEET_BREAKER_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.environ.get("SHEET_BREAKER_COOLDOWN", "30"))
+BREAKER_MAX_COOLDOWN = 600
+
+_session = None
+_executor = None
+_request_executor = None
+_lock = threading.Lock()
+_schemas = {}
+_labels = {}
+
+# -------------------------
+# URL helpers
+# -------------------------
+def extract_doc_id(sheet_url: str) -> str:
+    m = re.search(r"/d/([a-zA-Z0-9-_]+)", sheet_url)
+    return m.group(1) if m else ""
+
+def extract_gid(sheet_url: str) -> str:
+    m = re.search(r"[#&]gid=([0-9]+)", sheet_url)
+    if m:
+        return m.group(1)
+    m = re.search(r"[?&]gid=([0-9]+)", sheet_url)
+    if m:
+        return m.group(1)
+    return "0"
+
+def uses_service_account(sheet_url: str) -> bool:
+    """URLs prefixed with "service_account:" are read through the Sheets API (gsheets_api.py)."""
+    return sheet_url.startswith(SERVICE_ACCOUNT_PREFIX)
+
+def build_export_urls(doc_id: str, gid: str):
+    urls = []
+    urls.append(f"{SHEETS_BASE_URL}/spreadsheets/d/{doc_id}/export?format=csv&gid={gid}")
+    urls.append(f"{SHEETS_BASE_URL}/spreadsheets/d/{doc_id}/gviz/tq?tqx=out:csv&gid={gid}")
+    return urls
+
+# -------------------------
+# Shared session / worker pool
+# -------------------------
+def get_session():
+    """One keep-alive session shared by every fetch (and every worker thread)."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_FETCH_WORKERS * 2)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS, thread_name_prefix="sheet-fetch")
+    return _executor
+
+def get_request_executor() -> ThreadPoolExecutor:
+    """Separate pool for individual (possibly hedged) requests, so fetch workers never wait on their own pool."""
+    global _request_executor
+    with _lock:
+        if _request_executor is None:
+            _request_executor = ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS * 2, thread_name_prefix="sheet-request")
+    return _request_executor
+
+# -------------------------
+# Endpoint health: latency window + circuit breaker
+# -------------------------
+class EndpointHealth:
+    """Recent latencies and breaker state for one endpoint kind ("export", "gviz", "batchGet")."""
+
+    def __init__(self, name: str, window: int = 200):
+        self.name = name
+        self.latencies = deque(maxlen=window)
+        self.failures = 0
+        self.open_until = 0.0
+        self.cooldown = BREAKER_COOLDOWN
+        self._lock = threading.Lock()
+
+    def p95(self):
+        with self._lock:
+            samples = sorted(self.latencies)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[int(0.95 * (len(samples) - 1))]
+
+    def hedge_delay(self) -> float:
+        p95 = self.p95()
+        return HEDGE_DEFAULT_DELAY if p95 is None else max(HEDGE_MIN_DELAY, p95)
+
+    def state(self) -> str:
+        if self.failures < BREAKER_THRESHOLD:
+            return "closed"
+        return "open" if time.time() < self.open_until else "half-open"
+
+    def allow(self) -> bool:
+        """Whether to send a request now; once open, one trial request per request timeout is let through after the cooldown."""
+        with self._lock:
+            if self.failures < BREAKER_THRESHOLD:
+                return True
+            now = time.time()
+            if now >= self.open_until:
+                self.open_until = now + FETCH_CONNECT_TIMEOUT + FETCH_TIMEOUT
+                return True
+            return False
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.latencies.append(latency)
+            self.failures = 0
+            self.cooldown = BREAKER_COOLDOWN
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= BREAKER_THRESHOLD:
+                self.open_until = time.time() + self.cooldown
+                self.cooldown = min(BREAKER_MAX_COOLDOWN, self.cooldown * 2)
+                opened = True
+            else:
+                opened = False
+        if opened:
+            metrics.inc("sheet_breaker_open_total", endpoint=self.name)
+
+_health = {}
+
+def endpoint_health(name: str) -> EndpointHealth:
+    with _lock:
+        return _health.setdefault(name, EndpointHealth(name))
+
+def endpoint_health_rows():
+    """One row per endpoint seen so far, for the diagnostics table."""
+    with _lock:
+        healths = list(_health.values())
+    rows = []
+    for h in healths:
+        p95 = h.p95()
+        rows.append({"endpoint": h.name, "breaker": h.state(), "consecutive failures": h.failures,
+                     "p95 ms": round(p95 * 1000, 1) if p95 is not None else None,
+                     "hedge after ms": round(h.hedge_delay() * 1000, 1)})
+    return rows
+
+def endpoint_kind(url: str) -> str:
+    return "gviz" if "/gviz/" in url else "export"
+
+def is_endpoint_failure(status) -> bool:
+    """Errors that say something about the endpoint (throttling, outages), not about the sheet."""
+    return status is None or status == 429 or status >= 500
+
+# -------------------------
+# Sheet cache
+# -------------------------
+class CacheEntry:
+    __slots__ = ("df", "url", "status", "snippet", "etag", "last_modified", "fetched_at", "nbytes")
+
+    def __init__(self, df, url, status, snippet, etag=None, last_modified=None):
+        self.df = df
+        self.url = url
+        self.status = status
+        self.snippet = snippet
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.time()
+        self.nbytes = int(df.memory_usage(deep=True).sum()) + len(snippet)
+
+    def result(self):
+        return self.df, self.url, self.status, self.snippet
+
+class SheetCache:
+    """
+    Process-wide LRU of parsed sheets keyed by (doc_id, gid), bounded by the
+    approximate in-memory size of the cached DataFrames.
+    Cached DataFrames are shared between sessions: treat them as read-only.
+    """
+
+    def __init__(self, ttl: float = SHEET_CACHE_TTL, max_bytes: int = SHEET_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "revalidated": 0, "evictions": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def key_lock(self, key) -> threading.Lock:
+        """Per-sheet lock so concurrent sessions don't fetch the same sheet twice."""
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def record(self, event: str):
+        # Called from fetch workers, revalidation and hedged-request threads at once.
+        with self._lock:
+            self.stats[event] += 1
+        metrics.inc("sheet_cache_requests_total", result=event)
+
+    def is_fresh(self, entry) -> bool:
+        return time.time() - entry.fetched_at < self.ttl
+
+    def put(self, key, entry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old.nbytes
+            self._entries[key] = entry
+            self.total_bytes += entry.nbytes
+            # Always keep the newest entry, even if it alone exceeds the cap.
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+                self.stats["evictions"] += 1
+                metrics.inc("sheet_cache_requests_total", result="evictions")
+
+    def touch(self, entry):
+        entry.fetched_at = time.time()
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self.total_bytes = 0
+            else:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self.total_bytes -= old.nbytes
+
+sheet_cache = SheetCache()
+
+def sheet_key(sheet_url: str):
+    return extract_doc_id(sheet_url), extract_gid(sheet_url)
+
+def set_sheet_label(sheet_url: str, label: str):
+    """Human-readable name (e.g. "drawer_3") used for the sheet in metrics."""
+    _labels[sheet_key(sheet_url)] = label
+
+def sheet_label(doc_id: str, gid: str) -> str:
+    return _labels.get((doc_id, gid), doc_id[:12])
+
+# -------------------------
+# Streaming CSV parse
+# -------------------------
+def set_sheet_schema(sheet_url: str, dtypes=None):
+    """
+    Default column types for a sheet, used whenever fetch_sheet_csv is called
+    for it without explicit ones. dtypes maps column position -> dtype
+    (e.g. {0: "Int32", 1: "category"}).
+    A string key is a case-insensitive header regex instead: it types the first
+    column not typed by position whose header matches (e.g. {"time": "datetime64[ns]"}).
+    """
+    _schemas[sheet_key(sheet_url)] = dict(dtypes) if dtypes else None
+
+class ResponseStream(io.RawIOBase):
+    """
+    Binary file-like view of a streamed response body, so pd.read_csv parses it
+    chunk by chunk instead of from a full in-memory copy. The first bytes are
+    kept aside for debug snippets, and the body size is counted.
+    """
+
+    def __init__(self, resp, chunk_size: int = STREAM_CHUNK_BYTES, head_bytes: int = SNIPPET_CHARS):
+        self._chunks = resp.iter_content(chunk_size=chunk_size)
+        self._buf = memoryview(b"")
+        self.head = bytearray()
+        self.head_bytes = head_bytes
+        self.nbytes = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buf:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self.nbytes += len(chunk)
+            if len(self.head) < self.head_bytes:
+                self.head += chunk[:self.head_bytes - len(self.head)]
+            self._buf = memoryview(chunk)
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+    def snippet(self) -> str:
+        return bytes(self.head).decode("utf-8", errors="replace")
+
+def response_encoding(resp) -> str:
+    # requests assumes ISO-8859-1 for text/* without a charset; sheets export UTF-8.
+    if "charset=" in resp.headers.get("Content-Type", "").lower():
+        return resp.encoding or "utf-8"
+    return "utf-8"
+
+def is_int_dtype(dtype) -> bool:
+    return isinstance(dtype, str) and dtype.lower().startswith(("int", "uint"))
+
+def is_datetime_dtype(dtype) -> bool:
+    return isinstance(dtype, str) and dtype.lower().startswith("datetime")
+
+def nullable_int_dtype(dtype: str) -> str:
+    """"int"/"int32"/"uint8" -> "Int64"/"Int32"/"UInt8" so empty cells become <NA>."""
+    dtype = dtype.lower()
+    if dtype == "int":
+        return "Int64"
+    return "UInt" + dtype[4:] if dtype.startswith("uint") else "Int" + dtype[3:]
+
+def convert_column(df, col, dtype):
+    """
+    Type one parsed column in place. Integer and datetime types are applied only
+    when every non-empty cell converts, so a stray text cell keeps the column
+    as-is instead of failing the sheet.
+    """
+    import pandas as pd
+
+    if is_int_dtype(dtype):
+        num = pd.to_numeric(df[col], errors="coerce")
+        if num.isna().sum() == df[col].isna().sum() and (num.dropna() % 1 == 0).all():
+            try:
+                df[col] = num.astype(nullable_int_dtype(dtype))
+            except (TypeError, ValueError, OverflowError):
+                pass  # values out of range for the requested width
+    elif is_datetime_dtype(dtype):
+        parsed = pd.to_datetime(df[col], errors="coerce")
+        if parsed.isna().sum() == df[col].isna().sum():
+            df[col] = parsed
+    else:
+        df[col] = df[col].astype(dtype)
+
+def parse_csv_stream(stream, encoding="utf-8", dtypes=None):
+    """
+    Parse CSV from a binary stream and apply dtypes (see set_sheet_schema).
+    Plain dtypes are handed to the parser; integer, datetime and header-matched
+    ones are applied after parsing with convert_column.
+    """
+    import pandas as pd
+
+    dtypes = dtypes or {}
+    positional = {pos: dt for pos, dt in dtypes.items() if isinstance(pos, int)}
+    read_dtypes = {pos: dt for pos, dt in positional.items() if not is_int_dtype(dt) and not is_datetime_dtype(dt)}
+    df = pd.read_csv(stream, encoding=encoding, dtype=read_dtypes or None)
+    typed = set()
+    for pos, dt in positional.items():
+        if pos >= df.shape[1]:
+            continue
+        typed.add(pos)
+        if pos not in read_dtypes:
+            convert_column(df, df.columns[pos], dt)
+    for pattern, dt in dtypes.items():
+        if isinstance(pattern, int):
+            continue
+        for idx, col in enumerate(df.columns):
+            if idx not in typed and re.search(pattern, str(col), re.I):
+                typed.add(idx)
+                convert_column(df, col, dt)
+                break
+    return df
+
+def read_head(resp, limit: int = SNIPPET_CHARS) -> str:
+    """First part of a (streamed) error body, without downloading the rest."""
+    try:
+        data = resp.raw.read(limit, decode_content=True) or b""
+        return data.decode(response_encoding(resp), errors="replace")
+    except Exception:
+        return ""
+    finally:
+        resp.close()
+
+# -------------------------
+# Fetching
+# -------------------------
+def read_options(doc_id: str, gid: str, dtypes=None):
+    """Resolve read options (falling back to the registered schema) -> (cache key, dtypes)."""
+    if dtypes is None:
+        dtypes = _schemas.get((doc_id, gid))
+    key = (doc_id, gid, tuple(sorted(dtypes.items(), key=lambda kv: str(kv[0]))) if dtypes else None)
+    return key, dtypes
+
+def fetch_sheet_csv(sheet_url: str, force: bool = False, dtypes=None):
+    """
+    Try each export endpoint for the sheet and return (df, used_url, status, snippet).
+    df is None when nothing could be loaded; snippet then holds the error text.
+
+    The body is streamed into the CSV parser. dtypes (see set_sheet_schema) sets
+    column types; without it the sheet's registered schema, if any, is used.
+    Every column is kept: one parsed copy (and snapshot) serves all panes.
+
+    URLs prefixed with "service_account:" are read through the Sheets API
+    instead (see fetch_service_account).
+
+    Results are cached per (doc_id, gid, read options) for SHEET_CACHE_TTL seconds.
+    After that the stale copy is returned at once and revalidated in the
+    background (stale-while-revalidate); force=True waits for the revalidation.
+    Revalidation is a conditional request, so an unchanged sheet only costs a 304.
+    Endpoints are raced with hedging and skipped while their breaker is open
+    (see _fetch_uncached).
+    """
+    doc_id = extract_doc_id(sheet_url)
+    if not doc_id:
+        return None, None, None, "Could not extract document id from URL."
+
+    if uses_service_account(sheet_url):
+        return fetch_service_account(doc_id, {None: sheet_url}, force, dtypes)[None]
+
+    key, dtypes = read_options(doc_id, extract_gid(sheet_url), dtypes)
+    gid = key[1]
+
+    entry = sheet_cache.get(key)
+    if entry is not None and not force:
+        if sheet_cache.is_fresh(entry):
+            sheet_cache.record("hits")
+        else:
+            sheet_cache.record("stale")
+            revalidate_in_background(key, dtypes)
+        return entry.result()
+
+    with sheet_cache.key_lock(key):
+        # Another session may have refreshed the sheet while we waited.
+        latest = sheet_cache.get(key)
+        if latest is not None and latest is not entry and sheet_cache.is_fresh(latest):
+            sheet_cache.record("hits")
+            return latest.result()
+        entry = latest
+        sheet_cache.record("misses")
+        with metrics.timer("sheet_fetch_seconds", sheet=sheet_label(doc_id, gid)):
+            return _fetch_uncached(key, entry, dtypes)
+
+_revalidating = set()
+
+def revalidate_in_background(key, dtypes=None):
+    """Refresh a stale cache entry off the render path, unless a fetch for it is already scheduled or running."""
+    with _lock:
+        if key in _revalidating:
+            return
+        _revalidating.add(key)
+
+    def run():
+        lock = sheet_cache.key_lock(key)
+        try:
+            if lock.acquire(blocking=False):
+                try:
+                    with metrics.timer("sheet_fetch_seconds", sheet=sheet_label(*key[:2])):
+                        _fetch_uncached(key, sheet_cache.get(key), dtypes)
+                finally:
+                    lock.release()
+        finally:
+            with _lock:
+                _revalidating.discard(key)
+    get_executor().submit(run)
+
+def request_endpoint(url: str, headers: dict, label: str):
+    """GET one endpoint (streamed); returns (response or None, error text). Feeds the endpoint's health."""
+    endpoint = endpoint_kind(url)
+    health = endpoint_health(endpoint)
+    start = time.perf_counter()
+    try:
+        with metrics.timer("sheet_request_seconds", sheet=label, endpoint=endpoint):
+            resp = get_session().get(url, timeout=(FETCH_CONNECT_TIMEOUT, FETCH_TIMEOUT), headers=headers, stream=True)
+    except Exception as e:
+        metrics.inc("sheet_requests_total", sheet=label, endpoint=endpoint, status="error")
+        health.record_failure()
+        return None, str(e)
+    metrics.inc("sheet_requests_total", sheet=label, endpoint=endpoint, status=resp.status_code)
+    if is_endpoint_failure(resp.status_code):
+        health.record_failure()
+    else:
+        health.record_success(time.perf_counter() - start)
+    return resp, ""
+
+def close_response(fut):
+    resp = fut.result()[0]
+    if resp is not None:
+        resp.close()
+
+def race_endpoints(urls, entry, label: str):
+    """
+    Request urls in order of preference, starting the next one early (a hedge)
+    when the current one is slower than its endpoint's p95, or at once when it
+    fails. Returns (response, url, last_status, last_error) for the first 200
+    (or 304 for a cached copy); response is None if every endpoint failed.
+    """
+    executor = get_request_executor()
+    remaining = list(urls)
+    pending = {}
+    last_url, last_status, last_snippet = (urls[-1] if urls else None), None, ""
+
+    def launch():
+        url = remaining.pop(0)
+        headers = {}
+        if entry is not None and entry.url == url:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        pending[executor.submit(request_endpoint, url, headers, label)] = url
+
+    launch()
+    while pending:
+        hedge = remaining and HEDGING_ENABLED
+        delay = endpoint_health(endpoint_kind(next(reversed(pending.values())))).hedge_delay() if hedge else None
+        done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+        if not done:
+            metrics.inc("sheet_hedged_requests_total", sheet=label)
+            launch()
+            continue
+        for fut in done:
+            url = pending.pop(fut)
+            resp, error = fut.result()
+            last_url = url
+            if resp is not None and (resp.status_code == 200 or (resp.status_code == 304 and entry is not None)):
+                for loser in pending:
+                    loser.add_done_callback(close_response)
+                return resp, url, resp.status_code, ""
+            last_status = resp.status_code if resp is not None else None
+            last_snippet = read_head(resp) if resp is not None else error
+            if remaining and not pending:
+                launch()
+    return None, last_url, last_status, last_snippet
+
+def _fetch_uncached(key, entry, dtypes=None):
+    doc_id, gid = key[:2]
+    label = sheet_label(doc_id, gid)
+    candidate_urls = build_export_urls(doc_id, gid)
+
+    urls = [url for url in candidate_urls if endpoint_health(endpoint_kind(url)).allow()]
+    if not urls:
+        metrics.inc("sheet_breaker_rejected_total", sheet=label)
+        return None, candidate_urls[-1], None, "All sheet endpoints are failing (circuit breaker open); will retry after the cooldown."
+
+    resp, url, status, snippet = race_endpoints(urls, entry, label)
+    if resp is None:
+        return None, url, status, snippet
+    if resp.status_code == 304:
+        resp.close()
+        sheet_cache.record("revalidated")
+        sheet_cache.touch(entry)
+        return entry.result()
+
+    stream = ResponseStream(resp)
+    try:
+        # Body download and parsing overlap, so they are timed together.
+        with metrics.timer("sheet_download_parse_seconds", sheet=label):
+            df = parse_csv_stream(io.BufferedReader(stream, STREAM_CHUNK_BYTES), encoding=response_encoding(resp),
+                                  dtypes=dtypes)
+    except Exception as e:
+        return None, url, resp.status_code, f"Fetched content but failed to parse CSV: {e}\nSnippet: {stream.snippet()}"
+    finally:
+        metrics.inc("sheet_bytes_total", stream.nbytes, sheet=label)
+        resp.close()
+    new_entry = CacheEntry(df, url, resp.status_code, stream.snippet(),
+                           etag=resp.headers.get("ETag"),
+                           last_modified=resp.headers.get("Last-Modified"))
+    sheet_cache.put(key, new_entry)
+    return new_entry.result()
+
+def fetch_service_account(doc_id: str, sheet_urls: dict, force: bool = False, dtypes=None) -> dict:
+    """
+    Read several tabs of one spreadsheet through the Sheets API with a single
+    values:batchGet call. sheet_urls maps key -> sheet URL; returns key ->
+    fetch_sheet_csv-style result. The API has no conditional requests, so stale
+    entries are simply re-read. Values go through the same CSV parser as the
+    export path so read options behave identically.
+    """
+    results = {}
+    pending = {}
+    for name, url in sheet_urls.items():
+        key, types = read_options(doc_id, extract_gid(url), dtypes)
+        entry = sheet_cache.get(key)
+        if entry is not None and not force and sheet_cache.is_fresh(entry):
+            sheet_cache.record("hits")
+            results[name] = entry.result()
+        else:
+            pending[name] = (key, types)
+    if not pending:
+        return results
+    if not doc_id:
+        return {**results, **{name: (None, None, None, "Could not extract document id from URL.") for name in pending}}
+
+    try:
+        import gsheets_api
+    except ImportError as e:
+        msg = f"Service-account backend needs gspread and google-auth: {e}"
+        return {**results, **{name: (None, None, None, msg) for name in pending}}
+
+    gids = sorted({key[1] for key, _ in pending.values()})
+    label = sheet_label(doc_id, gids[0]) if len(gids) == 1 else doc_id[:12]
+    api_url = f"{gsheets_api.SPREADSHEETS_API_V4_BASE_URL}/{doc_id}/values:batchGet"
+    for _ in pending:
+        sheet_cache.record("misses")
+    health = endpoint_health("batchGet")
+    if not health.allow():
+        msg = "Sheets API is failing (circuit breaker open); will retry after the cooldown."
+        return {**results, **{name: (None, api_url, None, msg) for name in pending}}
+    start = time.perf_counter()
+    try:
+        with metrics.timer("sheet_request_seconds", sheet=label, endpoint="batchGet"):
+            values = gsheets_api.batch_get(doc_id, gids)
+    except Exception as e:
+        status = gsheets_api.error_status(e)
+        metrics.inc("sheet_requests_total", sheet=label, endpoint="batchGet", status=status or "error")
+        if is_endpoint_failure(status):
+            health.record_failure()
+        return {**results, **{name: (None, api_url, status, str(e)) for name in pending}}
+    health.record_success(time.perf_counter() - start)
+    metrics.inc("sheet_requests_total", sheet=label, endpoint="batchGet", status=200)
+
+    for name, (key, types) in pending.items():
+        rows = values.get(key[1])
+        if rows is None:
+            results[name] = (None, api_url, 404, f"No worksheet with gid={key[1]} in the spreadsheet.")
+            continue
+        body = gsheets_api.values_to_csv(rows)
+        snippet = body[:SNIPPET_CHARS].decode("utf-8", errors="replace")
+        metrics.inc("sheet_bytes_total", len(body), sheet=sheet_label(*key[:2]))
+        try:
+            with metrics.timer("sheet_download_parse_seconds", sheet=sheet_label(*key[:2])):
+                df = parse_csv_stream(io.BytesIO(body), dtypes=types)
+        except Exception as e:
+            results[name] = (None, api_url, 200, f"Fetched values but failed to parse them: {e}\nSnippet: {snippet}")
+            continue
+        entry = CacheEntry(df, api_url, 200, snippet)
+        sheet_cache.put(key, entry)
+        results[name] = entry.result()
+    return results
+
+def fetch_many(sheet_urls: dict, force: bool = False):
+    """
+    Fetch several sheets in parallel. sheet_urls maps key -> sheet URL.
+    Yields (key, fetch_sheet_csv result) in completion order, so callers can
+    render each sheet as soon as it arrives; total time ~ the slowest sheet.
+    Service-account URLs are grouped per spreadsheet into one batched API call.
+    """
+    executor = get_executor()
+    futures = {}
+    batches = {}
+    for key, url in sheet_urls.items():
+        if uses_service_account(url):
+            batches.setdefault(extract_doc_id(url), {})[key] = url
+        else:
+            futures[executor.submit(fetch_sheet_csv, url, force)] = [key]
+    for doc_id, urls in batches.items():
+        futures[executor.submit(fetch_service_account, doc_id, urls, force)] = list(urls)
+    for fut in as_completed(futures):
+        keys = futures[fut]
+        try:
+            result = fut.result()
+            results = result if isinstance(result, dict) else {keys[0]: result}
+        except Exception as e:
+            results = {key: (None, None, None, str(e)) for key in keys}
+        for key in keys:
+            yield key, results[key]
@@ -0,0 +1,328 @@
+"""
+Persistent inventory / usage storage.
+
+The store is process-wide (shared by every Streamlit session) and pluggable:
+INVENTORY_STORE selects a backend registered in STORE_BACKENDS, SQLite by
+default. Reads are paged or streamed in chunks so the UI never has to hold
+the whole catalog in memory.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+INVENTORY_STORE = os.environ.get("INVENTORY_STORE", "sqlite")
+INVENTORY_DB_PATH = os.environ.get("INVENTORY_DB_PATH", os.path.join(APP_DIR, "inventory.db"))
+
+INVENTORY_COLUMNS = ["id", "name", "category", "quantity", "location", "status", "last_updated"]
+USAGE_COLUMNS = ["event_id", "item_id", "item_name", "user", "action", "timestamp"]
+ITEM_STATE_COLUMNS = ["item_id", "item_name", "user", "action", "event_id", "timestamp"]
+
+# Sort orders the Inventory Table may ask for; each is backed by an index.
+INVENTORY_ORDERS = {
+    "category": "category, name, id",
+    "name": "name, id",
+    "location": "location, name, id",
+    "id": "id",
+}
+
+
+class InventoryStore:
+    """Interface every storage backend implements."""
+
+    def is_empty(self) -> bool:
+        raise NotImplementedError
+
+    def add_item(self, name, category, quantity, location, status, last_updated=None) -> int:
+        raise NotImplementedError
+
+    def get_item(self, item_id):
+        """The item as a dict, or None if there is no such id."""
+        raise NotImplementedError
+
+    def count_items(self, query: str = None) -> int:
+        """Number of items, or of items whose name/location contains query."""
+        raise NotImplementedError
+
+    def page_items(self, offset: int = 0, limit: int = 100, order: str = "category", query: str = None) -> pd.DataFrame:
+        """One page of items in the given INVENTORY_ORDERS order, optionally filtered by query."""
+        raise NotImplementedError
+
+    def iter_items(self, chunksize: int = 5000, order: str = "id"):
+        """Yield the inventory as DataFrames of at most chunksize rows."""
+        raise NotImplementedError
+
+    def data_version(self) -> int:
+        """Counter that changes whenever inventory rows are inserted, updated or deleted."""
+        raise NotImplementedError
+
+    def add_usage_event(self, item_id, item_name, user, action, timestamp=None) -> int:
+        raise NotImplementedError
+
+    def usage_for_item(self, item_id, limit: int = 100) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def append_usage_events(self, events) -> list:
+        """
+        Durably append (item_id, item_name, user, action, timestamp) tuples in one
+        transaction, i.e. one fsync for the whole batch. Returns their event ids.
+        """
+        raise NotImplementedError
+
+    def usage_events_since(self, event_id: int) -> pd.DataFrame:
+        """Usage events with a larger event_id, in append order."""
+        raise NotImplementedError
+
+    def load_item_states(self):
+        """Latest per-item state snapshot -> (DataFrame of ITEM_STATE_COLUMNS, last event_id it covers)."""
+        raise NotImplementedError
+
+    def save_item_states(self, states, last_event_id: int):
+        """Replace the per-item state snapshot with states (rows of ITEM_STATE_COLUMNS)."""
+        raise NotImplementedError
+
+    def import_frames(self, inventory: pd.DataFrame, usage: pd.DataFrame):
+        """Bulk-load inventory and usage rows (used to seed demo data)."""
+        raise NotImplementedError
+
+
+class SQLiteInventoryStore(InventoryStore):
+    """
+    SQLite backend. Inserts and indexed lookups are O(log n); WAL mode lets
+    sessions read while another one writes. Each thread gets its own connection.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS inventory (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        category TEXT NOT NULL,
+        quantity INTEGER NOT NULL DEFAULT 0,
+        location TEXT NOT NULL,
+        status TEXT NOT NULL,
+        last_updated TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_inventory_category ON inventory (category, name, id);
+    CREATE INDEX IF NOT EXISTS idx_inventory_name ON inventory (name, id);
+    CREATE INDEX IF NOT EXISTS idx_inventory_location ON inventory (location, name, id);
+
+    CREATE TABLE IF NOT EXISTS usage (
+        event_id INTEGER PRIMARY KEY,
+        item_id INTEGER NOT NULL,
+        item_name TEXT,
+        user TEXT,
+        action TEXT NOT NULL,
+        timestamp TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_usage_item ON usage (item_id, timestamp);
+    CREATE INDEX IF NOT EXISTS idx_usage_timestamp ON usage (timestamp);
+
+    -- Snapshot of who holds what, as of event store_meta.usage_snapshot_event_id.
+    CREATE TABLE IF NOT EXISTS item_state (
+        item_id INTEGER PRIMARY KEY,
+        item_name TEXT,
+        user TEXT,
+        action TEXT NOT NULL,
+        event_id INTEGER NOT NULL,
+        timestamp TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+    INSERT OR IGNORE INTO store_meta (key, value) VALUES ('inventory_version', 0);
+    INSERT OR IGNORE INTO store_meta (key, value) VALUES ('usage_snapshot_event_id', 0);
+    CREATE TRIGGER IF NOT EXISTS inventory_version_ai AFTER INSERT ON inventory BEGIN
+        UPDATE store_meta SET value = value + 1 WHERE key = 'inventory_version';
+    END;
+    CREATE TRIGGER IF NOT EXISTS inventory_version_ad AFTER DELETE ON inventory BEGIN
+        UPDATE store_meta SET value = value + 1 WHERE key = 'inventory_version';
+    END;
+    CREATE TRIGGER IF NOT EXISTS inventory_version_au AFTER UPDATE ON inventory BEGIN
+        UPDATE store_meta SET value = value + 1 WHERE key = 'inventory_version';
+    END;
+    """
+
+    # Trigram full-text index over name/location for substring search, kept in
+    # sync with the inventory table by triggers (requires SQLite >= 3.34).
+    SEARCH_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS inventory_search USING fts5(
+        name, location, content='inventory', content_rowid='id', tokenize='trigram'
+    );
+    CREATE TRIGGER IF NOT EXISTS inventory_search_ai AFTER INSERT ON inventory BEGIN
+        INSERT INTO inventory_search (rowid, name, location) VALUES (new.id, new.name, new.location);
+    END;
+    CREATE TRIGGER IF NOT EXISTS inventory_search_ad AFTER DELETE ON inventory BEGIN
+        INSERT INTO inventory_search (inventory_search, rowid, name, location) VALUES ('delete', old.id, old.name, old.location);
+    END;
+    CREATE TRIGGER IF NOT EXISTS inventory_search_au AFTER UPDATE ON inventory BEGIN
+        INSERT INTO inventory_search (inventory_search, rowid, name, location) VALUES ('delete', old.id, old.name, old.location);
+        INSERT INTO inventory_search (rowid, name, location) VALUES (new.id, new.name, new.location);
+    END;
+    """
+    TRIGRAM_MIN_CHARS = 3
+
+    def __init__(self, path: str = INVENTORY_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self.conn().executescript(self.SCHEMA)
+        self.has_search_index = self.create_search_index()
+
+    def create_search_index(self) -> bool:
+        conn = self.conn()
+        try:
+            exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'inventory_search'").fetchone()
+            conn.executescript(self.SEARCH_SCHEMA)
+            if not exists:
+                # Index rows that predate the search table.
+                with conn:
+                    conn.execute("INSERT INTO inventory_search (inventory_search) VALUES ('rebuild')")
+            return True
+        except sqlite3.OperationalError:
+            return False  # no FTS5/trigram support: fall back to LIKE scans
+
+    def search_clause(self, query: str):
+        """(SQL WHERE clause, params) for a name/location substring filter."""
+        query = (query or "").strip()
+        if not query:
+            return "", ()
+        if self.has_search_index and len(query) >= self.TRIGRAM_MIN_CHARS:
+            phrase = '"' + query.replace('"', '""') + '"'
+            return "WHERE id IN (SELECT rowid FROM inventory_search WHERE inventory_search MATCH ?)", (phrase,)
+        like = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return "WHERE name LIKE ? ESCAPE '\\' OR location LIKE ? ESCAPE '\\'", (like, like)
+
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def is_empty(self) -> bool:
+        return self.conn().execute("SELECT 1 FROM inventory LIMIT 1").fetchone() is None
+
+    def add_item(self, name, category, quantity, location, status, last_updated=None) -> int:
+        last_updated = last_updated or datetime.now().isoformat()
+        with self._write_lock, self.conn() as conn:
+            cur = conn.execute(
+                "INSERT INTO inventory (name, category, quantity, location, status, last_updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (name, category, int(quantity), location, status, last_updated),
+            )
+            return cur.lastrowid
+
+    def get_item(self, item_id):
+        row = self.conn().execute(
+            f"SELECT {', '.join(INVENTORY_COLUMNS)} FROM inventory WHERE id = ?", (int(item_id),)
+        ).fetchone()
+        return dict(zip(INVENTORY_COLUMNS, row)) if row else None
+
+    def data_version(self) -> int:
+        return self.conn().execute("SELECT value FROM store_meta WHERE key = 'inventory_version'").fetchone()[0]
+
+    def count_items(self, query: str = None) -> int:
+        where, params = self.search_clause(query)
+        return self.conn().execute(f"SELECT COUNT(*) FROM inventory {where}", params).fetchone()[0]
+
+    def page_items(self, offset: int = 0, limit: int = 100, order: str = "category", query: str = None) -> pd.DataFrame:
+        order_by = INVENTORY_ORDERS.get(order, INVENTORY_ORDERS["id"])
+        where, params = self.search_clause(query)
+        return pd.read_sql_query(
+            f"SELECT {', '.join(INVENTORY_COLUMNS)} FROM inventory {where} ORDER BY {order_by} LIMIT ? OFFSET ?",
+            self.conn(), params=params + (int(limit), int(offset)),
+        )
+
+    def iter_items(self, chunksize: int = 5000, order: str = "id"):
+        order_by = INVENTORY_ORDERS.get(order, INVENTORY_ORDERS["id"])
+        yield from pd.read_sql_query(
+            f"SELECT {', '.join(INVENTORY_COLUMNS)} FROM inventory ORDER BY {order_by}",
+            self.conn(), chunksize=chunksize,
+        )
+
+    def add_usage_event(self, item_id, item_name, user, action, timestamp=None) -> int:
+        timestamp = timestamp or datetime.now().isoformat()
+        with self._write_lock, self.conn() as conn:
+            cur = conn.execute(
+                "INSERT INTO usage (item_id, item_name, user, action, timestamp) VALUES (?, ?, ?, ?, ?)",
+                (int(item_id), item_name, user, action, timestamp),
+            )
+            return cur.lastrowid
+
+    def usage_for_item(self, item_id, limit: int = 100) -> pd.DataFrame:
+        return pd.read_sql_query(
+            f"SELECT {', '.join(USAGE_COLUMNS)} FROM usage WHERE item_id = ? ORDER BY timestamp DESC LIMIT ?",
+            self.conn(), params=(int(item_id), int(limit)),
+        )
+
+    def append_usage_events(self, events) -> list:
+        with self._write_lock:
+            conn = self.conn()
+            # The commit must reach disk before appends are acknowledged; with
+            # group commit that is one fsync per batch rather than per event.
+            conn.execute("PRAGMA synchronous=FULL")
+            try:
+                with conn:
+                    return [conn.execute(
+                        "INSERT INTO usage (item_id, item_name, user, action, timestamp) VALUES (?, ?, ?, ?, ?)",
+                        (int(item_id), item_name, user, action, timestamp),
+                    ).lastrowid for item_id, item_name, user, action, timestamp in events]
+            finally:
+                conn.execute("PRAGMA synchronous=NORMAL")
+
+    def usage_events_since(self, event_id: int) -> pd.DataFrame:
+        return pd.read_sql_query(
+            f"SELECT {', '.join(USAGE_COLUMNS)} FROM usage WHERE event_id > ? ORDER BY event_id",
+            self.conn(), params=(int(event_id),),
+        )
+
+    def load_item_states(self):
+        conn = self.conn()
+        # One read transaction so the rows and the event id agree.
+        with conn:
+            conn.execute("BEGIN")
+            states = pd.read_sql_query(f"SELECT {', '.join(ITEM_STATE_COLUMNS)} FROM item_state", conn)
+            last = conn.execute("SELECT value FROM store_meta WHERE key = 'usage_snapshot_event_id'").fetchone()[0]
+        return states, last
+
+    def save_item_states(self, states, last_event_id: int):
+        with self._write_lock, self.conn() as conn:
+            conn.execute("DELETE FROM item_state")
+            conn.executemany(
+                f"INSERT INTO item_state ({', '.join(ITEM_STATE_COLUMNS)}) VALUES ({', '.join('?' * len(ITEM_STATE_COLUMNS))})",
+                states,
+            )
+            conn.execute("UPDATE store_meta SET value = ? WHERE key = 'usage_snapshot_event_id'", (int(last_event_id),))
+
+    def import_frames(self, inventory: pd.DataFrame, usage: pd.DataFrame):
+        with self._write_lock, self.conn() as conn:
+            conn.executemany(
+                f"INSERT OR IGNORE INTO inventory ({', '.join(INVENTORY_COLUMNS)}) VALUES ({', '.join('?' * len(INVENTORY_COLUMNS))})",
+                inventory[INVENTORY_COLUMNS].itertuples(index=False, name=None),
+            )
+            conn.executemany(
+                f"INSERT OR IGNORE INTO usage ({', '.join(USAGE_COLUMNS)}) VALUES ({', '.join('?' * len(USAGE_COLUMNS))})",
+                usage[USAGE_COLUMNS].itertuples(index=False, name=None),
+            )
+
+
+STORE_BACKENDS = {
+    "sqlite": SQLiteInventoryStore,
+}
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store() -> InventoryStore:
+    """The process-wide store selected by INVENTORY_STORE."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            backend = STORE_BACKENDS.get(INVENTORY_STORE)
+            if backend is None:
+                raise ValueError(f"Unknown INVENTORY_STORE backend: {INVENTORY_STORE!r}")
+            _store = backend()
+        return _store
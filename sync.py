@@ -0,0 +1,495 @@
+"""
+Background Google Sheets synchronizer with a local snapshot mirror.
+
+A daemon thread polls every registered sheet on a jittered schedule (with
+exponential backoff while a sheet keeps failing) and writes each successfully
+parsed sheet to SNAPSHOT_DIR as an Arrow IPC file plus a small JSON sidecar
+with its fetch time and last error. Page renders read the memory-mapped
+snapshots, so they don't wait on Google, and an outage shows the last good
+data with its timestamp instead of an error.
+
+Several worker processes can share one SNAPSHOT_DIR: a file lock elects one
+of them to run the background sync (another takes over if it exits), and
+inline fetches of the same sheet are serialised across workers, so each
+sheet is fetched and parsed once per change rather than once per worker.
+
+Each sheet can also register a small summary (e.g. a drawer's count of
+removed items), computed when its snapshot is rewritten and kept for all
+sheets in one summary.json, so panes can decide what to show without loading
+every snapshot.
+
+Renders wait at most SHEET_READ_BUDGET seconds for an inline fetch; past that
+they get the last snapshot (or a "still fetching" note) while the fetch
+finishes in the background and the live fragments pick up the result.
+"""
+import os
+import json
+import time
+import queue
+import random
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: locks are then per process only
+    fcntl = None
+
+from metrics import metrics
+from sheets import fetch_sheet_csv, fetch_many, sheet_key, sheet_label
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", os.path.join(APP_DIR, "data", "snapshots"))
+SYNC_ENABLED = os.environ.get("SHEET_SYNC_ENABLED", "1") != "0"
+SYNC_INTERVAL = float(os.environ.get("SHEET_SYNC_INTERVAL", "60"))
+SYNC_MAX_BACKOFF = float(os.environ.get("SHEET_SYNC_MAX_BACKOFF", "900"))
+SYNC_JITTER = 0.2
+# Decoded snapshot frames kept in memory (least recently read dropped first).
+SNAPSHOT_MEMO_MAX_BYTES = int(os.environ.get("SNAPSHOT_MEMO_MAX_BYTES", str(256 * 1024 * 1024)))
+# Longest a render waits on inline fetches before showing what it has.
+SHEET_READ_BUDGET = float(os.environ.get("SHEET_READ_BUDGET", "5"))
+LOCK_DIR = os.path.join(SNAPSHOT_DIR, ".locks")
+SUMMARY_PATH = os.path.join(SNAPSHOT_DIR, "summary.json")
+
+_loaded = OrderedDict()  # data path -> (mtime_ns, df, nbytes)
+_loaded_bytes = 0
+_loaded_lock = threading.Lock()
+_written = {}
+_thread_locks = {}
+_locks_lock = threading.Lock()
+_leader_file = None
+_summarizers = {}
+_summary_memo = {"mtime_ns": None, "data": {}}
+_status_memo = {"key": None, "data": None}
+
+# -------------------------
+# Cross-process locks
+# -------------------------
+@contextmanager
+def file_lock(name: str):
+    """Exclusive lock held across threads and across worker processes sharing SNAPSHOT_DIR."""
+    with _locks_lock:
+        lock = _thread_locks.setdefault(name, threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(LOCK_DIR, exist_ok=True)
+        with open(os.path.join(LOCK_DIR, name + ".lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def sheet_lock_name(sheet_url: str, purpose: str) -> str:
+    doc_id, gid = sheet_key(sheet_url)
+    return f"{purpose}-{doc_id}_{gid}"
+
+def try_lead() -> bool:
+    """
+    True if this process runs the background sync for SNAPSHOT_DIR. The lock is
+    held for the life of the process, so the OS hands it to a waiting worker
+    when the leader exits.
+    """
+    global _leader_file
+    if _leader_file is not None or fcntl is None:
+        return True
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    f = open(os.path.join(LOCK_DIR, "sync-leader.lock"), "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    _leader_file = f
+    metrics.inc("sync_leader_elected_total")
+    return True
+
+def is_sync_leader() -> bool:
+    return _leader_file is not None or (fcntl is None and _synchronizer is not None)
+
+
+# -------------------------
+# Snapshot files
+# -------------------------
+def snapshot_paths(sheet_url: str):
+    doc_id, gid = sheet_key(sheet_url)
+    base = os.path.join(SNAPSHOT_DIR, f"{doc_id}_{gid}")
+    return base + ".arrow", base + ".json"
+
+def read_meta(sheet_url: str) -> dict:
+    _, meta_path = snapshot_paths(sheet_url)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_meta(sheet_url: str, meta: dict):
+    _, meta_path = snapshot_paths(sheet_url)
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tmp = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+
+def to_arrow(df):
+    import pyarrow as pa
+
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type object columns: store them as strings.
+        obj_cols = {c: "string" for c in df.columns if df[c].dtype == object}
+        return pa.Table.from_pandas(df.astype(obj_cols), preserve_index=False)
+
+def write_snapshot(sheet_url: str, df, used_url, status):
+    """Atomically replace the sheet's snapshot and reset its error state."""
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    data_path, _ = snapshot_paths(sheet_url)
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    table = to_arrow(df)
+    with file_lock(sheet_lock_name(sheet_url, "write")):
+        tmp = f"{data_path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, data_path)
+        now = time.time()
+        write_meta(sheet_url, {"fetched_at": now, "last_attempt": now, "used_url": used_url,
+                               "status": status, "rows": len(df), "last_error": None, "failures": 0})
+
+def record_sync(sheet_url: str, error: str = None, status=None):
+    """Update the sidecar after a sync attempt that didn't produce new data."""
+    with file_lock(sheet_lock_name(sheet_url, "write")):
+        meta = read_meta(sheet_url)
+        meta["last_attempt"] = time.time()
+        if error is None:
+            meta["fetched_at"] = meta["last_attempt"]
+            meta["last_error"] = None
+            meta["failures"] = 0
+        else:
+            meta["last_error"] = f"HTTP {status}: {error}" if status else error
+            meta["failures"] = meta.get("failures", 0) + 1
+        write_meta(sheet_url, meta)
+
+# -------------------------
+# Snapshot summary
+# -------------------------
+def set_snapshot_summary(sheet_url: str, fn):
+    """Register fn(df) -> dict of JSON values, stored in the summary whenever the sheet's snapshot is rewritten."""
+    _summarizers[sheet_url] = fn
+
+def read_summary() -> dict:
+    """sheet URL -> summary values for every summarized snapshot. One file, decoded again only when it changes."""
+    try:
+        mtime_ns = os.stat(SUMMARY_PATH).st_mtime_ns
+    except OSError:
+        return {}
+    if _summary_memo["mtime_ns"] != mtime_ns:
+        try:
+            with open(SUMMARY_PATH, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        _summary_memo.update(mtime_ns=mtime_ns, data=data)
+    return _summary_memo["data"]
+
+def update_summary(sheet_url: str, df):
+    """Recompute the sheet's summary from df; the file is rewritten only if the values changed."""
+    fn = _summarizers.get(sheet_url)
+    if fn is None:
+        return
+    try:
+        values = fn(df)
+    except Exception:
+        metrics.inc("snapshot_summary_errors_total", sheet=sheet_label(*sheet_key(sheet_url)))
+        return
+    with file_lock("summary"):
+        summary = dict(read_summary())
+        if summary.get(sheet_url) == values:
+            return
+        summary[sheet_url] = values
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        tmp = f"{SUMMARY_PATH}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(summary, f)
+        os.replace(tmp, SUMMARY_PATH)
+
+def sync_status(sheet_urls) -> dict:
+    """
+    Sync state across sheet_urls: {"sheets", "synced", "failing", "newest"}
+    ("newest" is the latest fetched_at, None before the first sync).
+
+    Every meta write replaces a file in SNAPSHOT_DIR, which bumps the
+    directory's mtime, so the metas are re-read only when that changed: a quiet
+    poll is one stat. Within a second of a change the metas are always re-read,
+    in case a second write landed in the same coarse mtime tick. Without the
+    directory (sync disabled, or nothing written yet) no sheet has synced.
+    """
+    urls = tuple(sheet_urls)
+    try:
+        mtime_ns = os.stat(SNAPSHOT_DIR).st_mtime_ns
+    except OSError:
+        return {"sheets": len(urls), "synced": 0, "failing": 0, "newest": None}
+    key = (mtime_ns, urls)
+    if _status_memo["key"] == key and time.time_ns() - mtime_ns > 1_000_000_000:
+        return _status_memo["data"]
+    metas = [read_meta(url) for url in urls]
+    fetched = [m["fetched_at"] for m in metas if m.get("fetched_at")]
+    data = {"sheets": len(urls), "synced": len(fetched), "failing": sum(1 for m in metas if m.get("last_error")),
+            "newest": max(fetched) if fetched else None}
+    _status_memo.update(key=key, data=data)
+    return data
+
+def snapshot_version(sheet_url: str):
+    """Changes only when the snapshot data is rewritten (not on unchanged syncs)."""
+    try:
+        return os.stat(snapshot_paths(sheet_url)[0]).st_mtime_ns
+    except OSError:
+        return None
+
+def load_snapshot(sheet_url: str):
+    """
+    Memory-map the sheet's snapshot and return (df, meta), or (None, meta) if
+    there is none yet. Decoded frames are reused until the file changes, up to
+    SNAPSHOT_MEMO_MAX_BYTES in total.
+    """
+    data_path, _ = snapshot_paths(sheet_url)
+    meta = read_meta(sheet_url)
+    try:
+        mtime_ns = os.stat(data_path).st_mtime_ns
+    except OSError:
+        return None, meta
+    with _loaded_lock:
+        cached = _loaded.get(data_path)
+        hit = cached is not None and cached[0] == mtime_ns
+        if hit:
+            _loaded.move_to_end(data_path)
+    if hit:
+        metrics.inc("snapshot_reads_total", result="memo")
+        return cached[1], meta
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    with metrics.timer("snapshot_load_seconds", sheet=sheet_label(*sheet_key(sheet_url))):
+        with pa.memory_map(data_path, "r") as source:
+            df = ipc.open_file(source).read_all().to_pandas()
+    metrics.inc("snapshot_reads_total", result="decoded")
+    remember_snapshot(data_path, mtime_ns, df)
+    return df, meta
+
+def remember_snapshot(data_path: str, mtime_ns: int, df):
+    global _loaded_bytes
+    nbytes = int(df.memory_usage(deep=True).sum())
+    with _loaded_lock:
+        old = _loaded.pop(data_path, None)
+        if old is not None:
+            _loaded_bytes -= old[2]
+        _loaded[data_path] = (mtime_ns, df, nbytes)
+        _loaded_bytes += nbytes
+        # Always keep the newest frame, even if it alone exceeds the cap.
+        while _loaded_bytes > SNAPSHOT_MEMO_MAX_BYTES and len(_loaded) > 1:
+            _, (_, _, evicted) = _loaded.popitem(last=False)
+            _loaded_bytes -= evicted
+
+# -------------------------
+# Sync
+# -------------------------
+def sync_sheet(sheet_url: str, result=None) -> bool:
+    """Fetch one sheet (unless result is given) and update its snapshot; True on success."""
+    df, used_url, status, snippet = result if result is not None else fetch_sheet_csv(sheet_url, force=True)
+    label = sheet_label(*sheet_key(sheet_url))
+    if df is None:
+        metrics.inc("sheet_sync_total", sheet=label, result="error")
+        record_sync(sheet_url, error=snippet or "fetch failed", status=status)
+        return False
+    # A 304 from the sheet cache hands back the very frame we last wrote.
+    last = _written.get(sheet_url)
+    if last is not None and last() is df and os.path.exists(snapshot_paths(sheet_url)[0]):
+        metrics.inc("sheet_sync_total", sheet=label, result="unchanged")
+        record_sync(sheet_url)
+        if sheet_url in _summarizers and sheet_url not in read_summary():
+            update_summary(sheet_url, df)
+    else:
+        metrics.inc("sheet_sync_total", sheet=label, result="updated")
+        with metrics.timer("snapshot_write_seconds", sheet=label):
+            write_snapshot(sheet_url, df, used_url, status)
+        _written[sheet_url] = weakref.ref(df)
+        update_summary(sheet_url, df)
+    return True
+
+def snapshot_result(df, meta: dict):
+    """Shape a snapshot like a fetch_sheet_csv result."""
+    if df is not None:
+        return df, meta.get("used_url"), meta.get("status"), ""
+    return None, meta.get("used_url"), None, meta.get("last_error") or ""
+
+def needs_inline_fetch(sheet_url: str) -> bool:
+    """No snapshot yet, and no recent failed attempt to leave to the background worker."""
+    df, meta = load_snapshot(sheet_url)
+    return df is None and time.time() - meta.get("last_attempt", 0) > SYNC_INTERVAL
+
+def fetched_since(sheet_url: str, since: float) -> bool:
+    """Whether any worker attempted the sheet after `since` (e.g. while we waited for its lock)."""
+    return read_meta(sheet_url).get("last_attempt", 0) >= since
+
+def read_sheet(sheet_url: str, refresh: bool = False, budget: float = SHEET_READ_BUDGET):
+    """
+    Return ((df, used_url, status, snippet), meta) for a sheet from its local
+    snapshot. Only when refresh is requested, or no snapshot exists yet (first
+    start), is the sheet fetched inline, and then by one worker at a time: the
+    others wait and use its result. See read_sheets for the budget.
+    """
+    for _, result, meta in read_sheets({0: sheet_url}, refresh=refresh, budget=budget):
+        return result, meta
+
+def fetch_inline(pending: dict, refresh: bool, done: queue.Queue):
+    """Fetch and snapshot the pending sheets (key -> URL), putting each key on `done` when it is settled."""
+    started = time.time()
+    # Keys whose URLs name the same sheet (same doc/gid) share one lock, fetch and snapshot.
+    groups = {}
+    for key, url in pending.items():
+        groups.setdefault(sheet_lock_name(url, "fetch"), (url, []))[1].append(key)
+    try:
+        with ExitStack() as stack:
+            # Sorted so workers waiting on overlapping sets can't deadlock.
+            for name in sorted(groups):
+                stack.enter_context(file_lock(name))
+            # Sheets another worker fetched while we waited for the locks are settled already.
+            fetch = {name: url for name, (url, _) in groups.items()
+                     if not fetched_since(url, started) and (refresh or needs_inline_fetch(url))}
+            for name in groups.keys() - fetch.keys():
+                for key in groups[name][1]:
+                    done.put(key)
+            for name, result in fetch_many(fetch, force=True):
+                try:
+                    sync_sheet(fetch[name], result)
+                except Exception as e:
+                    record_sync(fetch[name], error=str(e))
+                for key in groups[name][1]:
+                    done.put(key)
+    finally:
+        for key in pending:
+            done.put(key)
+
+def read_sheets(sheet_urls: dict, refresh: bool = False, budget: float = SHEET_READ_BUDGET):
+    """
+    Like read_sheet for several sheets (key -> URL). Yields (key, result, meta):
+    sheets with a snapshot first, then any that must be fetched, in parallel and
+    in completion order. Fetches still running after `budget` seconds (None:
+    no limit) carry on in the background; their sheets are yielded from the
+    last snapshot, or with a "still fetching" snippet and meta["pending"] set.
+    """
+    pending = {}
+    for key, url in sheet_urls.items():
+        if refresh or needs_inline_fetch(url):
+            pending[key] = url
+            continue
+        df, meta = load_snapshot(url)
+        yield key, snapshot_result(df, meta), meta
+    if not pending:
+        return
+    done = queue.Queue()
+    threading.Thread(target=fetch_inline, args=(pending, refresh, done), name="sheet-inline-fetch", daemon=True).start()
+    deadline = None if budget is None else time.monotonic() + budget
+    remaining = dict(pending)
+    while remaining:
+        try:
+            key = done.get(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            break
+        url = remaining.pop(key, None)
+        if url is not None:
+            df, meta = load_snapshot(url)
+            yield key, snapshot_result(df, meta), meta
+    for key, url in remaining.items():
+        metrics.inc("sheet_read_budget_exceeded_total", sheet=sheet_label(*sheet_key(url)))
+        df, meta = load_snapshot(url)
+        result = snapshot_result(df, meta)
+        if df is None:
+            meta = {**meta, "pending": True}
+            result = (None, result[1], None, "Still fetching this sheet in the background; it will appear here once it arrives.")
+        yield key, result, meta
+
+
+class SheetSynchronizer(threading.Thread):
+    """Daemon thread that keeps the snapshots of a set of sheet URLs up to date."""
+
+    def __init__(self, sheet_urls, interval: float = SYNC_INTERVAL, max_backoff: float = SYNC_MAX_BACKOFF):
+        super().__init__(name="sheet-sync", daemon=True)
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.failures = {}
+        self.next_due = {}
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.replace(sheet_urls)
+
+    def replace(self, sheet_urls):
+        """Sync exactly these URLs from now on: new ones are scheduled, dropped ones forgotten."""
+        urls = set(sheet_urls)
+        with self.lock:
+            for url in list(self.next_due):
+                if url not in urls:
+                    del self.next_due[url]
+                    self.failures.pop(url, None)
+            for url in urls:
+                if url not in self.next_due:
+                    # Spread the first round over one interval instead of a burst.
+                    self.next_due[url] = time.time() + random.uniform(0, self.interval)
+
+    def delay(self, url: str) -> float:
+        failures = self.failures.get(url, 0)
+        base = min(self.max_backoff, self.interval * (2 ** failures))
+        return base * random.uniform(1 - SYNC_JITTER, 1 + SYNC_JITTER)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            # Only one worker process per SNAPSHOT_DIR syncs; the others stand by.
+            if not try_lead():
+                self.stop_event.wait(self.interval)
+                continue
+            now = time.time()
+            with self.lock:
+                due = [url for url, t in self.next_due.items() if t <= now]
+            # Fetched together so service-account sheets share one batched call.
+            fetched = dict(fetch_many({url: url for url in due}, force=True)) if due else {}
+            for url in due:
+                try:
+                    ok = sync_sheet(url, fetched[url])
+                except Exception as e:
+                    record_sync(url, error=str(e))
+                    ok = False
+                with self.lock:
+                    if url not in self.next_due:
+                        continue  # dropped while it was being fetched
+                    self.failures[url] = 0 if ok else self.failures.get(url, 0) + 1
+                    self.next_due[url] = time.time() + self.delay(url)
+            with self.lock:
+                wait = min(self.next_due.values(), default=now + self.interval) - time.time()
+            self.stop_event.wait(max(1.0, wait))
+
+    def stop(self):
+        self.stop_event.set()
+
+
+_synchronizer = None
+_sync_lock = threading.Lock()
+
+def start_background_sync(sheet_urls):
+    """Start (once per process) the synchronizer; later calls replace the set of synced URLs."""
+    global _synchronizer
+    if not SYNC_ENABLED:
+        return None
+    with _sync_lock:
+        if _synchronizer is None:
+            _synchronizer = SheetSynchronizer(sheet_urls)
+            _synchronizer.start()
+        else:
+            _synchronizer.replace(sheet_urls)
+        return _synchronizer
@@ -0,0 +1,51 @@
+"""
+Shared fixtures: the local Google Sheets stand-in (bench/fake_sheets.py) with
+the fetch layers pointed at it, and per-test snapshot / database directories.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Module-level config is read at import time: keep test runs off the real data dirs.
+_scratch = tempfile.mkdtemp(prefix="cloudportal-tests-")
+os.environ.setdefault("SNAPSHOT_DIR", os.path.join(_scratch, "snapshots"))
+os.environ.setdefault("INVENTORY_DB_PATH", os.path.join(_scratch, "inventory.db"))
+os.environ.setdefault("EXPORT_DIR", os.path.join(_scratch, "exports"))
+os.environ.setdefault("SHEET_SYNC_ENABLED", "0")
+
+import pytest
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    """A fresh FakeSheets server; CSV fetches and the Sheets API client both talk to it."""
+    import sheets
+    import gsheets_api
+    from bench.fake_sheets import FakeSheets
+
+    fake = FakeSheets()
+    server, base_url = fake.serve()
+    monkeypatch.setattr(sheets, "SHEETS_BASE_URL", base_url)
+    monkeypatch.setattr(gsheets_api, "SHEETS_API_BASE_URL", base_url)
+    monkeypatch.setattr(gsheets_api, "SERVICE_ACCOUNT_FILE", None)
+    monkeypatch.setattr(gsheets_api, "_client", None)
+    gsheets_api._titles.clear()
+    sheets.sheet_cache.invalidate()
+    sheets._health.clear()
+    yield fake
+    server.shutdown()
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    """Point the snapshot mirror (and its locks and summary) at a per-test directory."""
+    import sync
+
+    path = str(tmp_path / "snapshots")
+    monkeypatch.setattr(sync, "SNAPSHOT_DIR", path)
+    monkeypatch.setattr(sync, "LOCK_DIR", os.path.join(path, ".locks"))
+    monkeypatch.setattr(sync, "SUMMARY_PATH", os.path.join(path, "summary.json"))
+    return path
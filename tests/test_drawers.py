@@ -0,0 +1,30 @@
+import os
+import json
+
+import pytest
+
+from drawers import load_drawers
+
+
+def write(path, drawers, mtime_ns):
+    path.write_text(json.dumps({"drawers": drawers}))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_reparsed_only_when_the_file_changes(tmp_path):
+    path = tmp_path / "drawers.json"
+    write(path, [{"id": 2, "room": "Lab"}, {"id": 1}], 1_000_000_000)
+    drawers = load_drawers(str(path))
+    assert list(drawers) == [1, 2] and drawers[1]["name"] == "Drawer 1" and drawers[1]["room"] == "Unassigned"
+    assert load_drawers(str(path)) is drawers
+
+    write(path, [{"id": 1, "name": "Sockets"}], 2_000_000_000)
+    assert load_drawers(str(path))[1]["name"] == "Sockets"
+    assert load_drawers(str(tmp_path / "missing.json")) == {}
+
+
+def test_duplicate_id_is_rejected(tmp_path):
+    path = tmp_path / "drawers.json"
+    write(path, [{"id": 1}, {"id": "1"}], 1_000_000_000)
+    with pytest.raises(ValueError, match="listed twice"):
+        load_drawers(str(path))
@@ -0,0 +1,28 @@
+import pandas as pd
+
+from fleet import fleet_summary
+from history import currently_removed_items
+
+
+def drawer(keys, actions):
+    return pd.DataFrame({"Tool ID": keys, "Action": actions, "User": "alice",
+                         "Timestamp": pd.date_range("2025-01-01", periods=len(keys), freq="h")})
+
+
+def test_removed_counts_match_missing_items_for_untyped_keys():
+    frames = {
+        1: drawer([1.5, "A1", "A1", 2, None], ["removed", "returned", "removed", "removed", "removed"]),
+        2: drawer([1, 2, 1], ["removed", "removed", "returned"]),
+    }
+    summary = fleet_summary(frames)
+    removed = summary["removed_now"].set_index("drawer")["currently_removed"].to_dict()
+    assert removed == {d: len(currently_removed_items(df)) for d, df in frames.items()}
+    assert removed == {1: 3, 2: 1}
+    assert set(summary["top_tools"]["tool"]) >= {"D1 #A1", "D1 #1.5"}
+
+
+def test_typed_integer_keys():
+    df = drawer(pd.array([3, 4, 3], dtype="Int32"), pd.Categorical(["removed", "removed", "returned"]))
+    summary = fleet_summary({7: df})
+    assert summary["removed_now"]["currently_removed"].tolist() == [1]
+    assert summary["checkout"]["checkouts"].tolist() == [1]
@@ -0,0 +1,58 @@
+import pytest
+
+import gsheets_api
+from sheets import endpoint_health, fetch_many, fetch_service_account
+from bench.fake_sheets import sheet_url, synthetic_history
+
+
+def test_metadata_lookup(fake):
+    fake.set_sheet("doc-m", "0", synthetic_history(5))
+    fake.set_sheet("doc-m", "12", synthetic_history(5))
+    assert gsheets_api.sheet_titles("doc-m") == {"0": "Sheet0", "12": "Sheet12"}
+    gsheets_api.sheet_titles("doc-m")
+    assert fake.calls["metadata"] == 1  # cached
+
+
+def test_multi_tab_batch_get_one_result_per_url(fake):
+    for gid, rows in (("0", 10), ("1", 20), ("2", 30)):
+        fake.set_sheet("doc-b", gid, synthetic_history(rows, seed=int(gid)))
+    urls = {gid: sheet_url("doc-b", gid, service_account=True) for gid in ("0", "1", "2")}
+
+    results = fetch_service_account("doc-b", urls)
+    assert {k: r[0].shape for k, r in results.items()} == {"0": (10, 7), "1": (20, 7), "2": (30, 7)}
+    assert fake.calls["batchGet"] == 1
+    # fetch_many groups the same URLs into one batched call as well.
+    got = dict(fetch_many(urls, force=True))
+    assert set(got) == set(urls) and all(r[0] is not None for r in got.values())
+    assert fake.calls["batchGet"] == 2
+
+
+def test_unknown_tab_is_a_per_url_404_and_bad_range_a_400(fake):
+    fake.set_sheet("doc-u", "0", synthetic_history(5))
+    results = fetch_service_account("doc-u", {"ok": sheet_url("doc-u", "0", True), "gone": sheet_url("doc-u", "99", True)})
+    assert results["ok"][0] is not None
+    assert results["gone"][0] is None and results["gone"][2] == 404
+
+    with pytest.raises(gsheets_api.gspread.exceptions.APIError) as exc:
+        gsheets_api.get_client().values_batch_get("doc-u", ["'NoSuchTab'"])
+    assert gsheets_api.error_status(exc.value) == 400
+
+
+def test_unknown_document_is_a_404(fake):
+    [(df, _, status, snippet)] = fetch_service_account("missing-doc", {0: sheet_url("missing-doc", "0", True)}).values()
+    assert df is None and status == 404
+    assert endpoint_health("batchGet").failures == 0  # not the endpoint's fault
+
+
+def test_injected_5xx_counts_against_the_breaker(fake):
+    fake.set_sheet("doc-e", "0", synthetic_history(5))
+    fake.error_rate = 1.0
+    fake.error_status = 503
+    [(df, _, status, _)] = fetch_service_account("doc-e", {0: sheet_url("doc-e", "0", True)}).values()
+    assert df is None and status == 503
+    assert endpoint_health("batchGet").failures == 1
+
+
+def test_values_to_csv_pads_ragged_rows():
+    values = [["id", "action", "user"], ["1", "removed"], ["2"], []]
+    assert gsheets_api.values_to_csv(values) == b"id,action,user\n1,removed,\n2,,\n,,\n"
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from history import RemovedItemsTracker, currently_removed_items
+from bench.fake_sheets import synthetic_history
+
+
+def check(tracker, df):
+    assert_frame_equal(tracker.update(df), currently_removed_items(df))
+
+
+def test_successive_appends_match_the_full_computation():
+    df = synthetic_history(500, items=40, seed=3)
+    tracker = RemovedItemsTracker()
+    for end in (0, 1, 2, 50, 51, 200, 499, 500, 500):
+        check(tracker, df.iloc[:end])
+    assert tracker.rows_seen == 500
+
+
+def test_typed_drawer_schema():
+    df = synthetic_history(300, items=25, seed=4).astype({"Tool ID": "Int32", "Action": "category"})
+    tracker = RemovedItemsTracker()
+    for end in (100, 180, 300):
+        check(tracker, df.iloc[:end])
+
+
+def test_editing_the_last_processed_row_rebuilds():
+    df = synthetic_history(100, items=10, seed=5)
+    tracker = RemovedItemsTracker()
+    check(tracker, df)
+    edited = df.copy()
+    edited.iloc[-1, 1] = "returned" if "removed" in edited.iloc[-1, 1] else "removed"
+    check(tracker, edited)
+    check(tracker, pd.concat([edited, synthetic_history(20, items=10, seed=6)], ignore_index=True))
+
+
+def test_deleted_rows_and_changed_columns_rebuild():
+    df = synthetic_history(200, items=15, seed=7)
+    tracker = RemovedItemsTracker()
+    check(tracker, df)
+    check(tracker, df.iloc[:120].reset_index(drop=True))
+    check(tracker, df.drop(columns=["Note"]))
+
+
+def test_rows_with_an_empty_key_are_ignored():
+    df = pd.DataFrame({
+        "Tool ID": ["1", np.nan, "2", None, "1", np.nan],
+        "Action": ["removed", "removed", "removed", "removed", "returned", "removed"],
+    })
+    tracker = RemovedItemsTracker()
+    check(tracker, df.iloc[:3])
+    check(tracker, df)
+    assert tracker.update(df)["Tool ID"].tolist() == ["2"]
@@ -0,0 +1,71 @@
+import time
+
+import pandas as pd
+import pytest
+
+import sync
+from search import ToolIndex
+from storage import SQLiteInventoryStore
+from usage_log import UsageLog
+from bench.fake_sheets import sheet_url
+
+DRAWER = pd.DataFrame({
+    "Tool ID": [1, 2, 1, 3],
+    "Action": ["removed", "removed", "returned", "removed"],
+    "User": ["alice", "bob", "alice", "carol"],
+    "Tool name": ["Cordless Drill", "Hammer", "Cordless Drill", "Torque Wrench"],
+})
+
+
+def keys(hits):
+    return [(h["drawer"], h["key"]) for h in hits]
+
+
+def test_id_and_name_prefix_lookup():
+    index = ToolIndex()
+    index.index_drawer(1, DRAWER)
+    assert keys(index.search("2")) == [(1, 2)]
+    assert keys(index.search("cord dri")) == [(1, 1)]
+    assert keys(index.search("wrench")) == [(1, 3)]
+    [drill] = index.search("drill")
+    assert drill["out"] is False and drill["user"] == "alice"
+    assert index.search("saw") == []
+
+
+def test_drawer_is_reindexed_when_its_snapshot_changes(snapshot_dir):
+    url = sheet_url("doc-search")
+    sync.write_snapshot(url, DRAWER, url, 200)
+    index = ToolIndex()
+    index.refresh({1: url}, force=True)
+    assert keys(index.search("hammer")) == [(1, 2)]
+
+    time.sleep(0.01)  # a new mtime, so the snapshot version changes
+    sync.write_snapshot(url, DRAWER[DRAWER["Tool ID"] != 2], url, 200)
+    index.refresh({1: url}, force=True)
+    assert index.search("hammer") == []
+    index.refresh({}, force=True)
+    assert index.search("drill") == []
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteInventoryStore(str(tmp_path / "inventory.db"))
+
+
+def test_inventory_out_and_holder_follow_the_usage_log(store):
+    item_id = store.add_item(name="Laser Level", category="Tools", quantity=1, location="LB 172", status="available")
+    log = UsageLog(store)
+    index = ToolIndex()
+    index.refresh({}, store=store, usage=log, force=True)
+    [hit] = index.search("laser")
+    assert hit["out"] is False and hit["user"] is None
+
+    log.checkout(item_id, "dana", "Laser Level")
+    index.refresh({}, store=store, usage=log, force=True)
+    [hit] = index.search("laser")
+    assert hit["out"] is True and hit["user"] == "dana" and hit["action"] == "checked_out"
+
+    log.return_item(item_id, "dana")
+    index.refresh({}, store=store, usage=log, force=True)
+    assert index.search("laser")[0]["out"] is False
+    log.close()
@@ -0,0 +1,69 @@
+import time
+
+import sheets
+from metrics import metrics
+from sheets import CacheEntry, SheetCache, endpoint_health, fetch_sheet_csv
+from bench.fake_sheets import sheet_url, synthetic_history
+
+
+def hedged_requests():
+    return sum(r["count"] for r in metrics.rows() if r["metric"] == "sheet_hedged_requests_total")
+
+
+def test_eviction_is_counted_without_deadlocking():
+    cache = SheetCache(ttl=60, max_bytes=1)
+    for key in range(3):
+        cache.put(key, CacheEntry(synthetic_history(5), "u", 200, ""))
+    assert list(cache._entries) == [2]
+    assert cache.stats["evictions"] == 2
+
+
+def test_breaker_skips_export_after_repeated_5xx(fake):
+    fake.set_sheet("doc-o", "0", synthetic_history(5))
+    fake.export_error_rate = 1.0
+    fake.error_status = 503
+    url = sheet_url("doc-o")
+
+    for _ in range(sheets.BREAKER_THRESHOLD):
+        df, used, status, _ = fetch_sheet_csv(url, force=True)
+        assert df is not None and "gviz" in used  # export failed, gviz answered
+    assert endpoint_health("export").state() == "open"
+
+    before = fake.requests
+    df, used, _, _ = fetch_sheet_csv(url, force=True)
+    assert df is not None and "gviz" in used
+    assert fake.requests - before == 1  # export was not tried
+
+
+def test_slow_export_is_hedged_to_gviz(fake, monkeypatch):
+    monkeypatch.setattr(sheets, "HEDGE_DEFAULT_DELAY", 0.05)
+    fake.set_sheet("doc-h", "0", synthetic_history(5))
+    fake.export_slow_rate = 1.0
+    fake.slow_ms = 2000
+    hedged = hedged_requests()
+
+    start = time.perf_counter()
+    df, used, status, _ = fetch_sheet_csv(sheet_url("doc-h"), force=True)
+    assert df is not None and status == 200 and "gviz" in used
+    assert time.perf_counter() - start < 1.5
+    assert hedged_requests() == hedged + 1
+
+
+def test_stale_entry_is_served_at_once_and_revalidated(fake, monkeypatch):
+    fake.set_sheet("doc-s", "0", synthetic_history(5))
+    url = sheet_url("doc-s")
+    first, _, _, _ = fetch_sheet_csv(url)
+    monkeypatch.setattr(sheets.sheet_cache, "ttl", 0)
+    fake.latency_ms = 500
+    stats = dict(sheets.sheet_cache.stats)
+
+    start = time.perf_counter()
+    df, _, status, _ = fetch_sheet_csv(url)
+    assert time.perf_counter() - start < 0.3
+    assert df is first and status == 200
+    assert sheets.sheet_cache.stats["stale"] == stats["stale"] + 1
+
+    deadline = time.time() + 5
+    while sheets.sheet_cache.stats["revalidated"] == stats["revalidated"] and time.time() < deadline:
+        time.sleep(0.05)
+    assert sheets.sheet_cache.stats["revalidated"] == stats["revalidated"] + 1  # unchanged sheet: a 304
@@ -0,0 +1,120 @@
+import sync
+from bench.fake_sheets import sheet_url, synthetic_history
+
+
+def test_read_sheets_fetches_missing_snapshot_once(fake, snapshot_dir):
+    fake.set_sheet("doc-a", "0", synthetic_history(50, seed=1))
+    url = sheet_url("doc-a")
+
+    (df, _, status, _), meta = sync.read_sheet(url, budget=10)
+    assert df.shape == (50, 7) and status == 200 and meta["rows"] == 50
+    requests = fake.requests
+    (df2, _, _, _), _ = sync.read_sheet(url, budget=10)
+    assert df2.equals(df)
+    assert fake.requests == requests  # served from the snapshot
+
+
+def test_read_sheets_same_sheet_under_two_keys(fake, snapshot_dir):
+    # Two drawers configured with the same sheet (here also with a different URL
+    # shape) share one fetch lock; taking it twice used to hang the fetch thread.
+    fake.set_sheet("dup", "0", synthetic_history(40, seed=2))
+    url = sheet_url("dup")
+    other = "https://docs.google.com/spreadsheets/d/dup/edit?usp=sharing#gid=0"
+
+    results = {key: (result, meta) for key, result, meta in sync.read_sheets({6: url, 7: url, 8: other}, budget=10)}
+    assert set(results) == {6, 7, 8}
+    for (df, _, _, _), meta in results.values():
+        assert not meta.get("pending")
+        assert df.shape == (40, 7)
+    assert fake.requests == 1
+
+
+def test_read_sheets_over_budget_yields_pending_then_snapshot(fake, snapshot_dir):
+    fake.set_sheet("slow", "0", synthetic_history(30, seed=3))
+    fake.latency_ms = 1500
+    url = sheet_url("slow")
+
+    [(_, (df, _, _, snippet), meta)] = list(sync.read_sheets({1: url}, budget=0.2))
+    assert df is None and meta["pending"] and "background" in snippet
+    [(_, (df, _, _, _), meta)] = list(sync.read_sheets({1: url}, budget=10))
+    assert df.shape == (30, 7) and not meta.get("pending")
+
+
+def test_fetch_lock_is_exclusive_across_threads(snapshot_dir):
+    import threading
+
+    order = []
+
+    def other():
+        with sync.file_lock("fetch-x"):
+            order.append("other")
+
+    with sync.file_lock("fetch-x"):
+        t = threading.Thread(target=other)
+        t.start()
+        t.join(0.2)
+        order.append("holder")
+    t.join(2)
+    assert order == ["holder", "other"]
+
+
+def test_one_sync_leader_per_snapshot_dir(snapshot_dir, monkeypatch):
+    import os
+    import subprocess
+    import sys
+
+    # Another worker process takes the leader lock and holds it until told to exit.
+    child = subprocess.Popen(
+        [sys.executable, "-c", "import sync, sys; print(sync.try_lead(), flush=True); sys.stdin.read()"],
+        env=dict(os.environ, SNAPSHOT_DIR=snapshot_dir), cwd=os.path.dirname(os.path.dirname(__file__)) or ".",
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        assert child.stdout.readline().strip() == "True"
+        monkeypatch.setattr(sync, "_leader_file", None)
+        assert sync.try_lead() is False
+    finally:
+        child.communicate("")
+    assert sync.try_lead() is True  # the lock passes on when the leader exits
+    sync._leader_file.close()
+
+
+def test_sync_status_rereads_metas_only_after_a_write(snapshot_dir, monkeypatch):
+    urls = [sheet_url("doc-st", gid) for gid in ("0", "1")]
+    # No snapshot directory yet (e.g. sync disabled): nothing synced, on every poll.
+    for _ in range(2):
+        assert sync.sync_status(urls) == {"sheets": 2, "synced": 0, "failing": 0, "newest": None}
+    sync.write_snapshot(urls[0], synthetic_history(5), urls[0], 200)
+    sync.write_meta(urls[1], {"last_attempt": 1.0, "last_error": "HTTP 503"})
+    status = sync.sync_status(urls)
+    assert (status["synced"], status["failing"]) == (1, 1) and status["newest"] is not None
+
+    # Once the directory's mtime is settled, polls are answered without reading any meta.
+    read_meta, reads = sync.read_meta, []
+    monkeypatch.setattr(sync, "read_meta", lambda url: reads.append(url) or read_meta(url))
+    monkeypatch.setattr(sync.time, "time_ns", lambda: sync.os.stat(snapshot_dir).st_mtime_ns + 2_000_000_000)
+    assert sync.sync_status(urls) == status and reads == []
+
+    sync.write_meta(urls[1], {"last_attempt": 2.0, "last_error": None})
+    assert sync.sync_status(urls)["failing"] == 0 and len(reads) == 2
+
+
+def test_synchronizer_replace_drops_removed_sheets():
+    syncer = sync.SheetSynchronizer([sheet_url("doc-r", "0"), sheet_url("doc-r", "1")])
+    syncer.failures[sheet_url("doc-r", "1")] = 3
+    syncer.replace([sheet_url("doc-r", "0"), sheet_url("doc-r", "2")])
+    assert set(syncer.next_due) == {sheet_url("doc-r", "0"), sheet_url("doc-r", "2")}
+    assert syncer.failures == {}
+
+
+def test_decoded_snapshots_are_bounded(snapshot_dir, monkeypatch):
+    monkeypatch.setattr(sync, "_loaded", sync.OrderedDict())
+    monkeypatch.setattr(sync, "_loaded_bytes", 0)
+    urls = [sheet_url("doc-m", str(gid)) for gid in range(3)]
+    for url in urls:
+        sync.write_snapshot(url, synthetic_history(200), url, 200)
+    one = sync.load_snapshot(urls[0])[0].memory_usage(deep=True).sum()
+    monkeypatch.setattr(sync, "SNAPSHOT_MEMO_MAX_BYTES", int(one * 2.5))
+    for url in urls:
+        sync.load_snapshot(url)
+    assert list(sync._loaded) == [sync.snapshot_paths(url)[0] for url in urls[1:]]
+    assert sync._loaded_bytes <= sync.SNAPSHOT_MEMO_MAX_BYTES
@@ -0,0 +1,77 @@
+import time
+import threading
+
+import pytest
+
+from storage import SQLiteInventoryStore
+from usage_log import UsageLog
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteInventoryStore(str(tmp_path / "inventory.db"))
+
+
+def test_state_follows_the_log(store):
+    log = UsageLog(store)
+    first = log.checkout(1, "alice", "Drill")
+    log.checkout(2, "bob", "Hammer")
+    log.report_missing(3, "carol", "Glasses")
+    assert log.return_item(2, "bob") > first
+    assert log.holder(1)["user"] == "alice" and log.holder(1)["action"] == "checked_out"
+    assert log.holder(2) is None
+    assert log.current_state()["item_id"].tolist() == [3, 1]  # newest first
+    with pytest.raises(ValueError):
+        log.append(1, "alice", "borrowed")
+    log.close()
+
+
+def test_concurrent_appends_share_commits(store, monkeypatch):
+    batches = []
+    append = store.append_usage_events
+
+    def slow_append(events):
+        batches.append(len(events))
+        time.sleep(0.02)  # a slow fsync, so appends queue up behind it
+        return append(events)
+
+    monkeypatch.setattr(store, "append_usage_events", slow_append)
+    log = UsageLog(store)
+    ids = []
+    threads = [threading.Thread(target=lambda i=i: ids.append(log.checkout(i, f"user{i}"))) for i in range(40)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(ids) == sorted(set(ids)) and len(ids) == 40
+    assert sum(batches) == 40 and len(batches) < 40
+    assert len(log.current_state()) == 40
+    log.close()
+
+
+def test_restart_restores_state_from_snapshot_and_replay(store):
+    log = UsageLog(store)
+    log.checkout(1, "alice")
+    log.checkout(2, "bob")
+    log.close()  # final snapshot
+    _, snapshot_id = store.load_item_states()
+    assert snapshot_id == log.last_event_id
+
+    # Another writer (e.g. a second worker process) appends after the snapshot.
+    other = UsageLog(store)
+    other.return_item(1, "alice")
+    assert store.load_item_states()[1] == snapshot_id  # not snapshotted yet: must be replayed
+
+    reopened = UsageLog(store)
+    assert reopened.holder(1) is None and reopened.holder(2)["user"] == "bob"
+    other.close()
+    reopened.close()
+
+
+def test_readers_catch_up_with_other_writers(store):
+    reader, writer = UsageLog(store), UsageLog(store)
+    writer.checkout(9, "dana")
+    reader.catch_up()
+    assert reader.holder(9)["user"] == "dana"
+    reader.close()
+    writer.close()
@@ -0,0 +1,200 @@
+"""
+Append-only usage event log (checked_out / returned / reported_missing).
+
+Appends from every session and drawer terminal go through one writer thread
+that commits whatever has queued up as a single transaction (group commit),
+so concurrent terminals share one fsync instead of queueing for their own.
+The current per-item state ("who has what right now") is folded from the log
+in memory, making lookups O(1), and is periodically snapshotted to the store
+so a restart only replays events newer than the snapshot.
+"""
+import os
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from metrics import metrics
+from storage import get_store, ITEM_STATE_COLUMNS
+
+ACTIONS = ("checked_out", "returned", "reported_missing")
+
+USAGE_BATCH_MAX = int(os.environ.get("USAGE_BATCH_MAX", "500"))
+# After the first queued event, wait this long for others to join the batch.
+USAGE_BATCH_WAIT = float(os.environ.get("USAGE_BATCH_WAIT", "0.002"))
+USAGE_SNAPSHOT_EVERY = int(os.environ.get("USAGE_SNAPSHOT_EVERY", "1000"))
+USAGE_SNAPSHOT_INTERVAL = float(os.environ.get("USAGE_SNAPSHOT_INTERVAL", "300"))
+# Readers pick up events appended by other processes at most this often.
+USAGE_CATCH_UP_INTERVAL = float(os.environ.get("USAGE_CATCH_UP_INTERVAL", "1"))
+
+
+class PendingAppend:
+    __slots__ = ("row", "done", "event_id", "error")
+
+    def __init__(self, row):
+        self.row = row
+        self.done = threading.Event()
+        self.event_id = None
+        self.error = None
+
+
+class UsageLog:
+    """Group-committing writer plus the in-memory per-item state folded from the log."""
+
+    def __init__(self, store=None):
+        self.store = store or get_store()
+        self.state = {}
+        self.last_event_id = 0
+        self.snapshot_event_id = 0
+        self.snapshot_at = time.time()
+        self.caught_up_at = 0.0
+        self.queue = queue.Queue()
+        self.state_lock = threading.Lock()
+        self.load()
+        self.writer = threading.Thread(target=self.run, name="usage-log", daemon=True)
+        self.writer.start()
+
+    # ---- state ----
+    def load(self):
+        states, last = self.store.load_item_states()
+        with self.state_lock:
+            self.state = {int(r["item_id"]): r for r in states.to_dict("records")}
+            self.last_event_id = self.snapshot_event_id = last
+        self.catch_up()
+
+    def apply(self, event: dict):
+        item_id = int(event["item_id"])
+        if event["action"] == "returned":
+            self.state.pop(item_id, None)
+        else:
+            self.state[item_id] = {col: event[col] for col in ITEM_STATE_COLUMNS}
+        self.last_event_id = max(self.last_event_id, int(event["event_id"]))
+
+    def catch_up(self):
+        """Fold in events appended since the last one seen (by this or another process)."""
+        with self.state_lock:
+            events = self.store.usage_events_since(self.last_event_id)
+            for event in events.to_dict("records"):
+                self.apply(event)
+            self.caught_up_at = time.time()
+
+    def maybe_catch_up(self):
+        if time.time() - self.caught_up_at >= USAGE_CATCH_UP_INTERVAL:
+            self.catch_up()
+
+    def holder(self, item_id):
+        """Latest non-return event for the item (who has it / who reported it missing), or None."""
+        self.maybe_catch_up()
+        return self.state.get(int(item_id))
+
+    def current_state(self) -> pd.DataFrame:
+        """Every item that is currently checked out or reported missing."""
+        self.maybe_catch_up()
+        with self.state_lock:
+            rows = list(self.state.values())
+        return pd.DataFrame(rows, columns=ITEM_STATE_COLUMNS).sort_values("event_id", ascending=False, ignore_index=True)
+
+    def snapshot(self):
+        with self.state_lock:
+            rows = [tuple(s[col] for col in ITEM_STATE_COLUMNS) for s in self.state.values()]
+            last = self.last_event_id
+        self.store.save_item_states(rows, last)
+        self.snapshot_event_id = last
+        self.snapshot_at = time.time()
+
+    def maybe_snapshot(self):
+        behind = self.last_event_id - self.snapshot_event_id
+        if behind >= USAGE_SNAPSHOT_EVERY or (behind and time.time() - self.snapshot_at >= USAGE_SNAPSHOT_INTERVAL):
+            self.snapshot()
+
+    # ---- write path ----
+    def append(self, item_id, user, action, item_name=None, timestamp=None) -> int:
+        """Append one event and return its event_id once it is durably committed."""
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown usage action {action!r}; expected one of {ACTIONS}")
+        pending = PendingAppend((int(item_id), item_name, user, action, timestamp or datetime.now().isoformat()))
+        self.queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.event_id
+
+    def checkout(self, item_id, user, item_name=None, timestamp=None) -> int:
+        return self.append(item_id, user, "checked_out", item_name, timestamp)
+
+    def return_item(self, item_id, user, item_name=None, timestamp=None) -> int:
+        return self.append(item_id, user, "returned", item_name, timestamp)
+
+    def report_missing(self, item_id, user, item_name=None, timestamp=None) -> int:
+        return self.append(item_id, user, "reported_missing", item_name, timestamp)
+
+    def next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + USAGE_BATCH_WAIT
+        while len(batch) < USAGE_BATCH_MAX:
+            try:
+                batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            if any(p is None for p in batch):
+                batch = [p for p in batch if p is not None]
+                stop = True
+            else:
+                stop = False
+            if batch:
+                self.commit(batch)
+            if stop:
+                return
+
+    def commit(self, batch):
+        try:
+            with metrics.timer("usage_commit_seconds"):
+                ids = self.store.append_usage_events([p.row for p in batch])
+        except Exception as e:
+            for p in batch:
+                p.error = e
+                p.done.set()
+            return
+        metrics.inc("usage_batches_total")
+        metrics.inc("usage_events_total", len(batch))
+        for p, event_id in zip(batch, ids):
+            p.event_id = event_id
+        try:
+            # Replaying from the store (rather than applying the batch directly)
+            # keeps state in event order when other processes append too.
+            self.catch_up()
+            self.maybe_snapshot()
+        except Exception:
+            metrics.inc("usage_state_errors_total")
+        finally:
+            for p in batch:
+                p.done.set()
+
+    def close(self):
+        """Flush queued appends and write a final snapshot."""
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+        if self.last_event_id != self.snapshot_event_id:
+            self.snapshot()
+
+
+_log = None
+_log_lock = threading.Lock()
+
+def get_usage_log() -> UsageLog:
+    """The process-wide usage log over the shared store."""
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = UsageLog()
+            atexit.register(_log.close)
+        return _log